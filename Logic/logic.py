@@ -22,7 +22,7 @@ Original package contained implementations of functions and data structures
 for Knowledge bases and First-Order Logic.
 """
 
-import itertools, re
+import itertools, re, weakref
 from typing import Tuple
 import agents
 from logic_utils import *
@@ -74,15 +74,36 @@ class Expr:
     1 doesn't know how to add an Expr.  (Adding an __radd__ method to Expr
     wouldn't help, because int.__add__ is still called first.) Therefore,
     you should use Expr(1) + x instead, or ONE + x, or expr('1 + x').
+
+    Exprs are hash-consed: there is only ever one Expr of a given class with a
+    given op and args, which every constructor call for them returns (see
+    intern_expr).  So Exprs are immutable, their hash is computed once, and
+    x == y is usually decided by x is y.  Nodes of different classes with the
+    same op and args, e.g. Expr('P_0') and PropSymbolExpr('P', time=0), are
+    still equal.
     """
 
-    def __init__(self, op, *args):
+    def __new__(cls, op, *args):
         "Op is a string or number; args are Exprs (or are coerced to Exprs)."
         assert isinstance(op, str) or (isnumber(op) and not args)
-        self.op = num_or_str(op)
-        self.args = tuple(map(expr, args)) ## Coerce args to Exprs
-        if not args and not is_prop_symbol(self.op):
-            raise SyntaxError("Unacceptable symbol base name (%s). Name must start with an upper-case alphabetic character that and is not TRUE or FALSE. Furthermore, only the following are allowed: capital and lower case alphabetic, 0-9, _, \",\", [, and ]." % self.op)
+        if op not in _operators: # they are never numbers,and num_or_str is slow
+            op = num_or_str(op)
+        return intern_expr(cls, op, tuple(map(expr, args))) ## Coerce args to Exprs
+
+    def __init__(self, *args, **kwargs):
+        "Nothing to do, the node was built (or found) by __new__."
+        pass
+
+    def __reduce__(self):
+        "Copies and unpickled Exprs are interned like new ones."
+        state = dict((k, v) for k, v in self.__dict__.items() if k not in ('op', 'args', '_hash'))
+        return (reintern_expr, (type(self), self.op, self.args, state))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def __call__(self, *args):
         """Self must be a symbol with no args, such as Expr('F').  Create a new
@@ -103,7 +124,7 @@ class Expr:
 
     def __eq__(self, other):
         """x and y are equal iff their ops and args are equal."""
-        return (other is self) or (isinstance(other, Expr)
+        return (other is self) or (isinstance(other, Expr) and self._hash == other._hash
             and self.op == other.op and self.args == other.args)
 
     def __ne__(self, other):
@@ -111,7 +132,7 @@ class Expr:
 
     def __hash__(self):
         "Need a hash method so Exprs can live in dicts."
-        return hash(self.op) ^ hash(tuple(self.args))
+        return self._hash
 
     # See http://www.python.org/doc/current/lib/module-operator.html
     # Not implemented: not, abs, pos, concat, contains, *item, *slice
@@ -134,6 +155,51 @@ class Expr:
     def __xor__(self, other):    return Expr('^',  self, other)
     def __mod__(self, other):    return Expr('<=>',  self, other)
 
+_operators = frozenset(['~', '-', '>>', '<<', '+', '*', '/', '**', '<', '>', '>=', '<=', '<=>', '^', '&', '|'])
+_interned_exprs = {} # (class, type of op, op, ids of args) -> weak reference to the Expr for them
+_interned_prop_symbols = {} # (class, sym_str, index, time) -> weak reference to the PropSymbolExpr
+
+def _forgetter(table):
+    """Return the callback of the weak references in table, which removes the
+    entry of a node when it is freed.  (Like weakref.WeakValueDictionary, whose
+    lookups are slower.)"""
+    def forget(ref):
+        if table.get(ref.key) is ref:
+            del table[ref.key]
+    return forget
+
+_forget_expr = _forgetter(_interned_exprs)
+_forget_prop_symbol = _forgetter(_interned_prop_symbols)
+
+def intern_expr(cls, op, args, check=True):
+    """Return the instance of cls with op and args, building it if there is
+    none yet.  Nodes are kept in a weak table, so one that is no longer used
+    anywhere is freed.  The args are part of the key by identity: they are
+    alive as long as the node is, and the entry of the node goes before they
+    can be freed.  The type of op is part of it too, so Expr 1 and 1.0 differ."""
+    key = (cls, type(op), op, tuple(map(id, args)))
+    ref = _interned_exprs.get(key)
+    node = ref() if ref is not None else None
+    if node is None:
+        if check and not args and not is_prop_symbol(op):
+            raise SyntaxError("Unacceptable symbol base name (%s). Name must start with an upper-case alphabetic character that and is not TRUE or FALSE. Furthermore, only the following are allowed: capital and lower case alphabetic, 0-9, _, \",\", [, and ]." % op)
+        node = object.__new__(cls)
+        node.op = op
+        node.args = args
+        node._hash = hash((op, args))
+        _interned_exprs[key] = weakref.KeyedRef(node, _forget_expr, key)
+    return node
+
+def reintern_expr(cls, op, args, state):
+    "Return the interned node for a copied or unpickled Expr (see __reduce__)."
+    if 'sym_str' in state: # a PropSymbolExpr,interned by its fields
+        node = cls(state['sym_str'], *state['indicies'], time=state['time'])
+    else:
+        node = intern_expr(cls, op, args, check=False)
+    for k, v in state.items():
+        node.__dict__.setdefault(k, v)
+    return node
+
 class PropSymbolExpr(Expr):
     """An extension of Expr intended to represent a symbol. This SymbolExpr
     is a convenience for naming symbols, especially symbols whose names
@@ -141,7 +207,7 @@ class PropSymbolExpr(Expr):
     Symbol name must begin with a capital letter. This class helps to add
     brackets with enumerated indices to the end of the name.
     """
-    def __init__(self, sym_str: str, *index: Tuple[int], time: int = None):
+    def __new__(cls, sym_str: str, *index: Tuple[int], time: int = None):
         """Constructor taking a propositional logic symbol name and an optional set of index values,
         creating a symbol with the base name followed by brackets with the specific
         indices.
@@ -156,12 +222,23 @@ class PropSymbolExpr(Expr):
         >>> pos_2_3 = PropSymbolExpr("P",2,3)
         >>> print(pos_2_3)
         P[2,3]
+
+        Like every Expr the symbol is interned, by its (sym_str, index, time),
+        so asking for it again does not even format its name.  Symbols with the
+        same name, e.g. PropSymbolExpr('A_0') and PropSymbolExpr('A', time=0),
+        are equal but keep their own base name, index and time.
+        >>> PropSymbolExpr("P", 2, 3) is PropSymbolExpr("P", 2, 3) == Expr("P[2,3]")
+        True
+        >>> PropSymbolExpr("R_5").getTime(), PropSymbolExpr("R", time=5).getTime()
+        (None, 5)
         """
+        key = (cls, sym_str, index, time)
+        ref = _interned_prop_symbols.get(key)
+        node = ref() if ref is not None else None
+        if node is not None:
+            return node
         if not is_prop_symbol(sym_str):
             raise SyntaxError("Unacceptable symbol base name (%s). Name must start with an upper-case alphabetic character that and is not TRUE or FALSE. Furthermore, only the following are allowed: capital and lower case alphabetic, 0-9, _, \",\", [, and ]." % sym_str)
-        self.sym_str = sym_str
-        self.indicies = index
-        self.time = time
         if len(index) > 0:
             if len(index) > 4:
                 raise SyntaxError("Too many arguments to SymbolExpr constructor. SymbolExpr(symbol_str, [index1], [index2], [index3], [index4], time=[time]), or fewer indicies -- possibly 0.")
@@ -175,7 +252,13 @@ class PropSymbolExpr(Expr):
                 sym_str = '%s[%d,%d,%d,%d]' % (sym_str, *index)
         if time != None:
             sym_str = '%s_%d' % (sym_str, int(time))
-        Expr.__init__(self, sym_str)
+        node = object.__new__(cls)
+        node.op = sym_str
+        node.args = ()
+        node._hash = hash((sym_str, ()))
+        node.sym_str, node.indicies, node.time = key[1:]
+        _interned_prop_symbols[key] = weakref.KeyedRef(node, _forget_prop_symbol, key)
+        return node
         
     def getBaseName(self):
         return self.sym_str
@@ -304,11 +387,10 @@ class SpecialExpr(Expr):
     syntax while still having some way to create the constants 
     TRUE, FALSE, ZERO, ONE, and, TWO
     """
-    def __init__(self, op, *args):
+    def __new__(cls, op, *args):
         "Op is a string or number; args are Exprs (or are coerced to Exprs)."
         assert isinstance(op, str) or (isnumber(op) and not args)
-        self.op = num_or_str(op)
-        self.args = tuple(map(expr, args)) ## Coerce args to Exprs
+        return intern_expr(cls, num_or_str(op), tuple(map(expr, args)), check=False) ## Coerce args to Exprs
 
 TRUE, FALSE = tuple(map(SpecialExpr, ['TRUE', 'FALSE']))
 ZERO, ONE, TWO = tuple(map(SpecialExpr, [0, 1, 2]))
@@ -375,9 +457,11 @@ def pl_true(exp, model={}):
 
 ## Convert to Conjunctive Normal Form (CNF)
 
-def to_cnf(s):
+def to_cnf(s, mode='distribute'):
     """Convert a propositional logical sentence s to conjunctive normal form.
     That is, to the form ((A | ~B | ...) & (B | C | ...) & ...) [p. 253]
+    With mode='tseitin' the result is only equisatisfiable with s, but
+    linear in its size; see tseitin_cnf.
     >>> to_cnf("~(B|C)")
     (~B & ~C)
     >>> to_cnf("B <=> (P1|P2)")
@@ -390,11 +474,101 @@ def to_cnf(s):
     ((D | A | B | C) & (E | A | B | C))
     """
     if isinstance(s, str): s = expr(s)
+    if mode == 'tseitin':
+        return tseitin_cnf(s)
+    if mode != 'distribute':
+        raise ValueError("Unknown CNF conversion mode (%s), use 'distribute' or 'tseitin'." % mode)
     s = eliminate_implications(s) # Steps 1, 2 from p. 253
     s = move_not_inwards(s) # Step 3
     s = distribute_and_over_or(s) # Step 4
     return s
 
+TSEITIN_STR = 'TSEITIN' # base name of the auxiliary symbols of tseitin_cnf and ClauseBuilder
+_tseitin_indices = itertools.count(1) # auxiliary symbols are never reused
+
+def tseitin_cnf(s):
+    """Convert s to CNF by naming subformulas instead of distributing | over &.
+    Every compound subformula that is not a clause of the top-level
+    conjunction gets a fresh auxiliary symbol TSEITIN[n] and clauses that make
+    it equivalent to the subformula, so the result has O(size of s) clauses
+    even where distribute_and_over_or blows up exponentially, e.g. for
+    disjunctions of conjunctions.
+
+    The result is equisatisfiable with s, not equivalent: any model of it is a
+    model of s once the auxiliary symbols are dropped (see
+    drop_auxiliary_symbols), and in it each auxiliary symbol has the value of
+    its subformula.
+    >>> cnf = tseitin_cnf(expr('(A & B) | (C & D) | E'))
+    >>> len(conjuncts(cnf))
+    7
+    >>> model = drop_auxiliary_symbols(pycoSAT(cnf & ~C & ~E))
+    >>> model[A], model[B], sorted(map(str, model))
+    (True, True, ['A', 'B', 'C', 'D', 'E'])
+    """
+    clauses = []
+    names = {} # subformula -> its auxiliary symbol
+    def negate(lit):
+        return lit.args[0] if lit.op == '~' else ~lit
+    def name(s):
+        "Return a literal equivalent to s, defining auxiliary symbols as needed."
+        if not s.args or is_symbol(s.op):
+            return s
+        if s.op == '~':
+            return negate(name(s.args[0]))
+        if s in names:
+            return names[s]
+        args = [name(arg) for arg in s.args]
+        aux = PropSymbolExpr(TSEITIN_STR, next(_tseitin_indices))
+        if s.op == '>>':
+            s_op, args = '|', [negate(args[0]), args[1]]
+        elif s.op == '<<':
+            s_op, args = '|', [args[0], negate(args[1])]
+        else:
+            s_op = s.op
+        if s_op == '&': # aux <=> (a1 & ... & an)
+            clauses.extend(~aux | a for a in args)
+            clauses.append(disjoin([aux] + [negate(a) for a in args]))
+        elif s_op == '|': # aux <=> (a1 | ... | an)
+            clauses.append(disjoin([~aux] + args))
+            clauses.extend(aux | negate(a) for a in args)
+        elif s_op in ('<=>', '^'):
+            assert len(args) == 2
+            a, b = args
+            if s_op == '^': # a ^ b is a <=> ~b
+                b = negate(b)
+            clauses.extend([disjoin(~aux, negate(a), b), disjoin(~aux, a, negate(b)),
+                            disjoin(aux, a, b), disjoin(aux, negate(a), negate(b))])
+        else:
+            raise ValueError("illegal operator in logic expression" + str(s))
+        names[s] = aux
+        return aux
+    top_clauses = []
+    for c in conjuncts(s):
+        if c.op == '|':
+            top_clauses.append(disjoin([name(d) for d in disjuncts(c)]))
+        elif c.op == '>>':
+            top_clauses.append(negate(name(c.args[0])) | name(c.args[1]))
+        elif c.op == '<<':
+            top_clauses.append(name(c.args[0]) | negate(name(c.args[1])))
+        elif c.op == '<=>':
+            a, b = name(c.args[0]), name(c.args[1])
+            top_clauses.extend([negate(a) | b, a | negate(b)])
+        else:
+            top_clauses.append(name(c))
+    return associate('&', top_clauses + clauses)
+
+def is_auxiliary_symbol(symbol):
+    "Return True if symbol was introduced by tseitin_cnf or ClauseBuilder.auxiliary."
+    return isinstance(symbol, PropSymbolExpr) and symbol.getBaseName() == TSEITIN_STR
+
+def drop_auxiliary_symbols(model):
+    """Return model without the auxiliary symbols of tseitin_cnf, i.e. a model
+    over the symbols of the original sentences."""
+    if model == False:
+        return model
+    return dict((symbol, value) for symbol, value in model.items()
+                if not is_auxiliary_symbol(symbol))
+
 def eliminate_implications(s):
     """Change >>, <<, and <=> into &, |, and ~. That is, return an Expr
     that is equivalent to s, but has only &, |, and ~ as logical operators.
@@ -701,3 +875,195 @@ def indexModelToExprModel(model_int, symbol_dict):
             model[symbol_dict[-lit_int]] = False
             
     return model
+
+class ClauseBuilder:
+    """Integer (DIMACS style) clauses and the table of the symbols they use.
+
+    Sentences can be added as Exprs (see add), which are converted to CNF, or
+    written directly as clauses of integer literals over variables from
+    variable(), which skips building and converting Expr trees altogether.
+    Both share one symbol table, so a variable is the index of its
+    PropSymbolExpr and models of the clauses are ordinary Expr models.
+    >>> builder = ClauseBuilder()
+    >>> p = builder.variable('P', 1, 2, time=0)
+    >>> builder.symbol_dict[p], builder.literal(~PropSymbolExpr('P', 1, 2, time=0)) == -p
+    (P[1,2]_0, True)
+    >>> builder.exactlyOne([builder.variable('X', i) for i in range(6)])
+    >>> len(builder.clauses), len(prop_symbols(builder.expr()))
+    (15, 11)
+    """
+
+    def __init__(self, mode='distribute'):
+        self.mode = mode # the to_cnf mode Exprs are converted with
+        self.symbol_dict = {} # bidirectional, see mapSymbolAndIndices
+        self.variables = {} # (sym_str, index, time) -> variable, see variable
+        self.clauses = []
+        self.has_auxiliary = mode == 'tseitin' # models leave the auxiliary symbols out
+
+    def index(self, symbol):
+        "Return the index of symbol, giving it the next free one if it is new."
+        if symbol not in self.symbol_dict:
+            idx = len(self.symbol_dict) // 2 + 1
+            self.symbol_dict[symbol] = idx
+            self.symbol_dict[idx] = symbol
+        return self.symbol_dict[symbol]
+
+    def variable(self, sym_str, *index, time=None):
+        """Return the variable of PropSymbolExpr(sym_str, *index, time=time),
+        e.g. variable(pacman_str, x, y, time=t)."""
+        key = (sym_str, index, time)
+        var = self.variables.get(key)
+        if var is None:
+            var = self.variables[key] = self.index(PropSymbolExpr(sym_str, *index, time=time))
+        return var
+
+    def auxiliary(self):
+        "Return a fresh variable that models leave out."
+        self.has_auxiliary = True
+        return self.index(PropSymbolExpr(TSEITIN_STR, next(_tseitin_indices)))
+
+    def literal(self, lit):
+        "Return the index of a symbol, or its negative for ~symbol."
+        if lit.op == '~':
+            return -self.index(lit.args[0])
+        return self.index(lit)
+
+    def sentenceClauses(self, sentence):
+        "Return the integer clauses of the CNF of sentence (any Expr)."
+        return [[self.literal(lit) for lit in disjuncts(clause)]
+                for clause in conjuncts(to_cnf(sentence, self.mode))]
+
+    def add(self, sentence):
+        "Add sentence (any Expr) to the knowledge base."
+        self.clauses.extend(self.sentenceClauses(sentence))
+
+    def addClause(self, clause):
+        "Add a clause, a list of integer literals (the disjunction of them)."
+        self.clauses.append(clause)
+
+    def atLeastOne(self, literals):
+        "Add that at least one of the integer literals is true."
+        self.clauses.append(list(literals))
+
+    def atMostOne(self, literals, encoding='sequential'):
+        """Add that at most one of the integer literals is true.
+        encoding='pairwise' adds a clause for every pair of literals;
+        'sequential' (a sequential counter: n - 1 auxiliary variables, each
+        saying one of the literals so far is true) and 'commander' (at most one
+        of every group of three, then of the groups' commanders) add O(n)
+        clauses.  Up to four literals are always pairwise, which is smaller."""
+        literals = list(literals)
+        n = len(literals)
+        if n <= 4 or encoding == 'pairwise':
+            self.clauses.extend([-a, -b] for a, b in itertools.combinations(literals, 2))
+        elif encoding == 'sequential':
+            counters = [self.auxiliary() for i in range(n - 1)]
+            self.clauses.append([-literals[0], counters[0]])
+            for i in range(1, n - 1):
+                self.clauses.append([-literals[i], counters[i]])
+                self.clauses.append([-counters[i - 1], counters[i]])
+                self.clauses.append([-literals[i], -counters[i - 1]])
+            self.clauses.append([-literals[-1], -counters[-1]])
+        elif encoding == 'commander':
+            commanders = []
+            for i in range(0, n, 3):
+                group = literals[i:i + 3]
+                commander = self.auxiliary()
+                self.atMostOne(group, 'pairwise')
+                self.clauses.extend([-lit, commander] for lit in group) # a true literal sets its commander
+                commanders.append(commander)
+            self.atMostOne(commanders, 'commander')
+        else:
+            raise ValueError("Unknown at most one encoding (%s), use 'pairwise', 'sequential' or 'commander'." % encoding)
+
+    def exactlyOne(self, literals, encoding='sequential'):
+        "Add that exactly one of the integer literals is true; see atMostOne."
+        self.atLeastOne(literals)
+        self.atMostOne(literals, encoding)
+
+    def exprModel(self, model_int):
+        "Return the Expr model of a pycosat solution of the clauses."
+        model = indexModelToExprModel(model_int, self.symbol_dict)
+        if self.has_auxiliary:
+            model = drop_auxiliary_symbols(model)
+        return model
+
+    def expr(self):
+        "Return the clauses as an Expr in CNF, e.g. to compare with an axiom."
+        def lit(i):
+            return self.symbol_dict[i] if i > 0 else ~self.symbol_dict[-i]
+        return conjoin([disjoin([lit(i) for i in clause]) for clause in self.clauses])
+
+
+class IncrementalSolver(ClauseBuilder):
+    """A satisfiability checker for a knowledge base that grows a piece at a
+    time, like a planner's, which learns about one more timestep after another.
+
+    Each sentence is converted to CNF and to integer clauses once, when it is
+    added, and the clauses are kept.  solve() gives pycosat the clauses so far
+    plus one unit clause per assumption; the assumptions only hold for that
+    call.  A goal that is not a literal can still be assumed through an
+    activation literal: add (G >> goal) and assume G.
+
+    This is an incremental interface, not incremental solving: pycosat has no
+    way to keep a solver (and what it learned) between calls or to pass it
+    assumptions, so picoSAT itself still starts from scratch on every call,
+    and itersolve only enumerates the models of one fixed formula.  What is
+    saved is converting the whole knowledge base to CNF again, which is the
+    part that grows with the horizon, and copying its clauses for each call.
+
+    mode is the to_cnf mode sentences are converted with.  Clauses can also
+    be added directly, see ClauseBuilder.
+    >>> solver = IncrementalSolver()
+    >>> solver.add(A | B)
+    >>> solver.solve([~A])[B]
+    True
+    >>> solver.solve([~A, ~B])
+    False
+    """
+
+    def solveWith(self, clauses_int):
+        """Return a model of the knowledge base and the extra integer clauses,
+        like pycoSAT does, or False if there is none."""
+        model_int = pycosat.solve(itertools.chain(self.clauses, clauses_int))
+
+        if model_int == 'UNSAT' or model_int == 'UNKNOWN':
+            return False
+
+        return self.exprModel(model_int)
+
+    def solve(self, assumptions=[]):
+        """Return a model of the knowledge base in which every literal in
+        assumptions is true, or False if there is none."""
+        return self.solveWith([[self.literal(lit)] for lit in assumptions])
+
+
+class KnowledgeBase(IncrementalSolver):
+    """A propositional knowledge base that is asked many queries as it grows,
+    like the ones of localization, mapping and slam.
+
+    Sentences are converted to integer CNF clauses once, when they are added
+    (see IncrementalSolver), so a query only converts itself: asking about
+    every cell at every timestep no longer converts the whole knowledge base
+    for each of them.
+    >>> kb = KnowledgeBase()
+    >>> kb.add(A >> B)
+    >>> kb.add(A)
+    >>> kb.entails(B)
+    True
+    >>> kb.findModel(~B)
+    False
+    >>> kb.findModel(C)[B]
+    True
+    """
+
+    def findModel(self, query=None):
+        """Return a model of the knowledge base and query (any Expr), or False
+        if they are unsatisfiable."""
+        if query is None:
+            return self.solveWith([])
+        return self.solveWith(self.sentenceClauses(query))
+
+    def entails(self, query):
+        "Return True if the knowledge base entails query."
+        return self.findModel(~query) == False
@@ -36,6 +36,7 @@ pacman_wall_str = pacman_str + wall_str
 ghost_pos_str = 'G'
 ghost_east_str = 'GE'
 pacman_alive_str = 'PA'
+goal_str = 'GOAL'
 DIRECTIONS = ['North', 'South', 'East', 'West']
 blocked_str_map = dict([(direction, (direction + "_blocked").upper()) for direction in DIRECTIONS])
 geq_num_adj_wall_str_map = dict([(num, "GEQ_{}_adj_walls".format(num)) for num in range(1, 4)])
@@ -419,28 +420,20 @@ def positionLogicPlan(problem) -> List:
             range(height + 2)))
     non_wall_coords = [loc for loc in all_coords if loc not in walls_list]
     actions = [ 'North', 'South', 'East', 'West' ]
-    KB = []
-    KB.append(PropSymbolExpr(pacman_str,x0,y0,time=0))
-    coords = []
-    dirs = []
+    KB = logic.IncrementalSolver() #keeps the clauses of every timestep so far,each timestep is added as clauses once
+    KB.add(PropSymbolExpr(pacman_str,x0,y0,time=0))
     for t in range(50):
         #pacman can only be at exactly one location and it cant be a wall
-        for (x,y) in non_wall_coords:
-            coords.append(PropSymbolExpr(pacman_str,x,y,time=t))
-        KB.append(exactlyOne(coords))
-        coords.clear()
+        KB.exactlyOne([KB.variable(pacman_str,x,y,time=t) for (x,y) in non_wall_coords])
         #pacman can take exactly one action per timestep
-        for action in actions:
-            dirs.append(PropSymbolExpr(action,time=t))
-        KB.append(exactlyOne(dirs))
-        dirs.clear()
-        #add tranisition model sentences
+        KB.exactlyOne([KB.variable(action,time=t) for action in actions])
+        #add tranisition model clauses
         for (x,y) in non_wall_coords:
-            KB.append(pacmanSuccessorAxiomSingle(x,y,t+1,walls_grid))
+            pacmanSuccessorClausesSingle(KB,x,y,t+1,walls_grid)
         #set the goal state
         goal = PropSymbolExpr(pacman_str,xg,yg,time=t)
-        #create a model of all the knowledge base + the goal state
-        model = findModel(conjoin(KB + [goal]))
+        #find a model of all the knowledge base + the goal state,the goal is only assumed for this timestep
+        model = KB.solve([goal])
         if model:
             return extractActionSequence(model,actions)
     #if code fails
@@ -472,32 +465,26 @@ def foodLogicPlan(problem) -> List:
     non_wall_coords = [loc for loc in all_coords if loc not in walls_list]
     actions = [ 'North', 'South', 'East', 'West' ]
 
-    KB = []
-    KB.append(PropSymbolExpr(pacman_str,x0,y0,time=0))
-    coords = []
-    dirs = []
-    foods = []
+    KB = logic.IncrementalSolver() #keeps the clauses of every timestep so far,each timestep is added as clauses once
+    KB.add(PropSymbolExpr(pacman_str,x0,y0,time=0))
+    for (x,y) in food: #every food is still there at the start
+        KB.add(PropSymbolExpr(food_str,x,y,time=0))
     for t in range(50):
         #pacman can only be at exactly one location and it cant be a wall
-        for(x,y) in food:
-            foods.append(PropSymbolExpr(food_str,x,y,time=t))
-        for (x,y) in non_wall_coords:
-            coords.append(PropSymbolExpr(pacman_str,x,y,time=t))
-        KB.append(exactlyOne(coords))
-        coords.clear()
+        KB.exactlyOne([KB.variable(pacman_str,x,y,time=t) for (x,y) in non_wall_coords])
         #pacman can take exactly one action per timestep
-        for action in actions:
-            dirs.append(PropSymbolExpr(action,time=t))
-        KB.append(exactlyOne(dirs))
-        dirs.clear()
-        #add tranisition model sentences
+        KB.exactlyOne([KB.variable(action,time=t) for action in actions])
+        #add tranisition model clauses
         for(x,y) in non_wall_coords:
-            KB.append(pacmanSuccessorAxiomSingle(x,y,t+1,walls))
+            pacmanSuccessorClausesSingle(KB,x,y,t+1,walls)
         for (x,y) in food:
-            KB.append((PropSymbolExpr(food_str,x,y,time=t) & ~PropSymbolExpr(pacman_str,x,y,time=t)) >> PropSymbolExpr(food_str,x,y,time=t+1))
-        #all foods are false so goal is true
-        goal = ~conjoin(foods)
-        model = findModel(conjoin(KB + [goal]))
+            #(food & ~pacman) >> next food
+            KB.addClause([-KB.variable(food_str,x,y,time=t), KB.variable(pacman_str,x,y,time=t), KB.variable(food_str,x,y,time=t+1)])
+        #the goal (every food is eaten at t) is switched on by an activation literal that is only assumed for this timestep
+        goal_literal = PropSymbolExpr(goal_str,time=t)
+        for (x,y) in food:
+            KB.addClause([-KB.literal(goal_literal), -KB.variable(food_str,x,y,time=t)])
+        model = KB.solve([goal_literal])
         if model:
             return (extractActionSequence(model,actions))
     #if code fails
@@ -519,29 +506,29 @@ def localization(problem, agent) -> Generator:
     all_coords = list(itertools.product(range(problem.getWidth()+2), range(problem.getHeight()+2)))
     non_outer_wall_coords = list(itertools.product(range(1, problem.getWidth()+1), range(1, problem.getHeight()+1)))
 
-    KB = []
+    KB = logic.KnowledgeBase() #keeps every sentence in CNF,so each query only converts itself
     #if there is a wall at (x,y) add it to the knowledge base
     #else add its negative
     for (x,y) in all_coords:
         if (x,y) in walls_list:
-            KB.append(PropSymbolExpr(wall_str,x,y))
+            KB.add(PropSymbolExpr(wall_str,x,y))
         else :
-            KB.append(~PropSymbolExpr(wall_str,x,y))
+            KB.add(~PropSymbolExpr(wall_str,x,y))
     for t in range(agent.num_timesteps):
         #add the pacman axioms
-        KB.append(pacphysicsAxioms(t,all_coords,non_outer_wall_coords,walls_grid,sensorAxioms,allLegalSuccessorAxioms))
+        pacphysicsClauses(KB,t,all_coords,non_outer_wall_coords,walls_grid,sensorClauses,allLegalSuccessorClauses)
         #add pacman's action at the current time
-        KB.append(PropSymbolExpr(agent.actions[t],time=t))
+        KB.add(PropSymbolExpr(agent.actions[t],time=t))
         #add the four bit percent ruels
-        KB.append(fourBitPerceptRules(t,agent.getPercepts()))
+        fourBitPerceptClauses(KB,t,agent.getPercepts())
         possible_locations = []
         for (x,y) in non_outer_wall_coords:
             #if there is a model ,then we have a possible location
-            if findModel(conjoin(KB + [PropSymbolExpr(pacman_str,x,y,time=t)])):
+            if KB.findModel(PropSymbolExpr(pacman_str,x,y,time=t)):
                 possible_locations.append((x,y))
             #if our KB entails the pacman pos,add the pos to KB
-            if entails(conjoin(KB),PropSymbolExpr(pacman_str,x,y,time=t)):
-                KB.append(PropSymbolExpr(pacman_str,x,y,time=t)) 
+            if KB.entails(PropSymbolExpr(pacman_str,x,y,time=t)):
+                KB.add(PropSymbolExpr(pacman_str,x,y,time=t)) 
         #get next state
         agent.moveToNextState(agent.actions[t])
         "*** END YOUR CODE HERE ***"
@@ -558,7 +545,7 @@ def mapping(problem, agent) -> Generator:
     agent: a MappingLogicAgent instance
     '''
     pac_x_0, pac_y_0 = problem.startState
-    KB = []
+    KB = logic.KnowledgeBase() #keeps every sentence in CNF,so each query only converts itself
     all_coords = list(itertools.product(range(problem.getWidth()+2), range(problem.getHeight()+2)))
     non_outer_wall_coords = list(itertools.product(range(1, problem.getWidth()+1), range(1, problem.getHeight()+1)))
 
@@ -572,32 +559,32 @@ def mapping(problem, agent) -> Generator:
                 or (y == 0 or y == problem.getHeight() + 1)):
             known_map[x][y] = 1
             outer_wall_sent.append(PropSymbolExpr(wall_str, x, y))
-    KB.append(conjoin(outer_wall_sent))
+    KB.add(conjoin(outer_wall_sent))
     "*** BEGIN YOUR CODE HERE ***"
     #add pacman pos to the KB
-    KB.append(PropSymbolExpr(pacman_str,pac_x_0,pac_y_0,time=0))
+    KB.add(PropSymbolExpr(pacman_str,pac_x_0,pac_y_0,time=0))
     #if there is a wall at pacman location
     #add it to KB
     if known_map[pac_x_0][pac_y_0] == 1:
-        KB.append(PropSymbolExpr(wall_str,pac_x_0,pac_y_0,time=0))
+        KB.add(PropSymbolExpr(wall_str,pac_x_0,pac_y_0,time=0))
     
     for t in range(agent.num_timesteps):
         #add pacman axioms
-        KB.append(pacphysicsAxioms(t,all_coords,non_outer_wall_coords,known_map,sensorAxioms,allLegalSuccessorAxioms))
+        pacphysicsClauses(KB,t,all_coords,non_outer_wall_coords,known_map,sensorClauses,allLegalSuccessorClauses)
         #add action to KB
-        KB.append(PropSymbolExpr(agent.actions[t],time=t))
+        KB.add(PropSymbolExpr(agent.actions[t],time=t))
         #add 4bitpercent rule
-        KB.append(fourBitPerceptRules(t,agent.getPercepts()))
+        fourBitPerceptClauses(KB,t,agent.getPercepts())
         for (x,y) in non_outer_wall_coords:
             #if there is a model then it is ambigious if we have a wall or not
-            model = findModel(conjoin(KB + [PropSymbolExpr(wall_str,x,y)]))
+            model = KB.findModel(PropSymbolExpr(wall_str,x,y))
             if model:
                 known_map[x][y] = -1
             else:#if there is no model there is not a wall at (x,y)
                 known_map[x][y] = 0
             #if KB entails the wall
-            if entails(conjoin(KB),PropSymbolExpr(wall_str,x,y)):
-                KB.append(PropSymbolExpr(wall_str,x,y)) #add wall to KB
+            if KB.entails(PropSymbolExpr(wall_str,x,y)):
+                KB.add(PropSymbolExpr(wall_str,x,y)) #add wall to KB
                 known_map[x][y] = 1 #there is wall
         #get to next state
         agent.moveToNextState(agent.actions[t])
@@ -614,7 +601,7 @@ def slam(problem, agent) -> Generator:
     agent: a SLAMLogicAgent instance
     '''
     pac_x_0, pac_y_0 = problem.startState
-    KB = []
+    KB = logic.KnowledgeBase() #keeps every sentence in CNF,so each query only converts itself
     all_coords = list(itertools.product(range(problem.getWidth()+2), range(problem.getHeight()+2)))
     non_outer_wall_coords = list(itertools.product(range(1, problem.getWidth()+1), range(1, problem.getHeight()+1)))
 
@@ -628,38 +615,38 @@ def slam(problem, agent) -> Generator:
                 or (y == 0 or y == problem.getHeight() + 1)):
             known_map[x][y] = 1
             outer_wall_sent.append(PropSymbolExpr(wall_str, x, y))
-    KB.append(conjoin(outer_wall_sent))
+    KB.add(conjoin(outer_wall_sent))
     #add pacman starting pos to KB
-    KB.append(PropSymbolExpr(pacman_str,pac_x_0,pac_y_0,time=0))
+    KB.add(PropSymbolExpr(pacman_str,pac_x_0,pac_y_0,time=0))
     #if there is a wall at pacman loc add it to KB
     if known_map[pac_x_0][pac_y_0] == 1:
-        KB.append(PropSymbolExpr(wall_str,pac_x_0,pac_y_0,time=0))
+        KB.add(PropSymbolExpr(wall_str,pac_x_0,pac_y_0,time=0))
     "*** BEGIN YOUR CODE HERE ***"
 
     for t in range(agent.num_timesteps):
         #get pacman axioms
-        KB.append(pacphysicsAxioms(t,all_coords,non_outer_wall_coords,known_map,SLAMSensorAxioms,SLAMSuccessorAxioms))
+        KB.add(pacphysicsAxioms(t,all_coords,non_outer_wall_coords,known_map,SLAMSensorAxioms,SLAMSuccessorAxioms))
         #add pacman's action KB
-        KB.append(PropSymbolExpr(agent.actions[t],time=t))
+        KB.add(PropSymbolExpr(agent.actions[t],time=t))
         #add the the adjascent perception rules
-        KB.append(numAdjWallsPerceptRules(t,agent.getPercepts()))
+        KB.add(numAdjWallsPerceptRules(t,agent.getPercepts()))
         #this is the same as q7
         for (x,y) in non_outer_wall_coords:
-            model = findModel(conjoin(KB + [PropSymbolExpr(wall_str,x,y)]))
+            model = KB.findModel(PropSymbolExpr(wall_str,x,y))
             if model:
                 known_map[x][y] = -1
             else:
                 known_map[x][y] = 0
-            if entails(conjoin(KB),PropSymbolExpr(wall_str,x,y)):
-                KB.append(PropSymbolExpr(wall_str,x,y))
+            if KB.entails(PropSymbolExpr(wall_str,x,y)):
+                KB.add(PropSymbolExpr(wall_str,x,y))
                 known_map[x][y] = 1
         #and this is the same as q6
         possible_locations = []
         for (x,y) in non_outer_wall_coords:
-            if findModel(conjoin(KB + [PropSymbolExpr(pacman_str,x,y,time=t)])):
+            if KB.findModel(PropSymbolExpr(pacman_str,x,y,time=t)):
                 possible_locations.append((x,y))
-            if entails(conjoin(KB),PropSymbolExpr(pacman_str,x,y,time=t)):
-                KB.append(PropSymbolExpr(pacman_str,x,y,time=t))
+            if KB.entails(PropSymbolExpr(pacman_str,x,y,time=t)):
+                KB.add(PropSymbolExpr(pacman_str,x,y,time=t))
         agent.moveToNextState(agent.actions[t])
         "*** END YOUR CODE HERE ***"
         yield (known_map, possible_locations)
@@ -783,6 +770,91 @@ def SLAMSuccessorAxioms(t: int, walls_grid: List[List], non_outer_wall_coords: L
             all_xy_succ_axioms.append(xy_succ_axiom)
     return conjoin(all_xy_succ_axioms)
 
+#______________________________________________________________________________
+# The same axioms written directly as integer clauses of a logic.ClauseBuilder (e.g. a
+# logic.KnowledgeBase), without building Expr trees and converting them to CNF.
+
+
+def pacmanSuccessorClausesSingle(builder: logic.ClauseBuilder, x: int, y: int, time: int, walls_grid: List[List[bool]]) -> bool:
+    """
+    Adds the clauses of pacmanSuccessorAxiomSingle(x, y, time, walls_grid) to builder,
+    the ones to_cnf gives for it. Returns False, adding nothing, where it returns None.
+    """
+    now, last = time, time - 1
+    possible_causes = [] # (position, action) variable pairs
+    if walls_grid[x][y+1] != 1:
+        possible_causes.append((builder.variable(pacman_str, x, y+1, time=last), builder.variable('South', time=last)))
+    if walls_grid[x][y-1] != 1:
+        possible_causes.append((builder.variable(pacman_str, x, y-1, time=last), builder.variable('North', time=last)))
+    if walls_grid[x+1][y] != 1:
+        possible_causes.append((builder.variable(pacman_str, x+1, y, time=last), builder.variable('West', time=last)))
+    if walls_grid[x-1][y] != 1:
+        possible_causes.append((builder.variable(pacman_str, x-1, y, time=last), builder.variable('East', time=last)))
+    if not possible_causes:
+        return False
+
+    current = builder.variable(pacman_str, x, y, time=now)
+    for position, action in possible_causes:
+        builder.addClause([-position, -action, current]) # every cause puts pacman here
+    for choice in itertools.product(*possible_causes):
+        builder.addClause([-current] + list(choice)) # pacman is only here through one of the causes
+    return True
+
+
+def allLegalSuccessorClauses(builder: logic.ClauseBuilder, t: int, walls_grid: List[List], non_outer_wall_coords: List[Tuple[int, int]]) -> None:
+    """allLegalSuccessorAxioms as clauses, see pacmanSuccessorClausesSingle."""
+    for x, y in non_outer_wall_coords:
+        pacmanSuccessorClausesSingle(builder, x, y, t, walls_grid)
+
+
+def sensorClauses(builder: logic.ClauseBuilder, t: int, non_outer_wall_coords: List[Tuple[int, int]]) -> None:
+    """sensorAxioms as clauses."""
+    for direction in DIRECTIONS:
+        percept_vars = []
+        dx, dy = DIR_TO_DXDY_MAP[direction]
+        for x, y in non_outer_wall_coords:
+            combo_var = builder.variable(pacman_wall_str, x, y, x + dx, y + dy, time=t)
+            pacman_var = builder.variable(pacman_str, x, y, time=t)
+            wall_var = builder.variable(wall_str, x + dx, y + dy)
+            percept_vars.append(combo_var)
+            # combo_var <=> pacman_var & wall_var
+            builder.addClause([-combo_var, pacman_var])
+            builder.addClause([-combo_var, wall_var])
+            builder.addClause([combo_var, -pacman_var, -wall_var])
+
+        # blocked_var <=> any of the percept_vars
+        blocked_var = builder.variable(blocked_str_map[direction], time=t)
+        builder.addClause([-blocked_var] + percept_vars)
+        for percept_var in percept_vars:
+            builder.addClause([blocked_var, -percept_var])
+
+
+def fourBitPerceptClauses(builder: logic.ClauseBuilder, t: int, percepts: List) -> None:
+    """fourBitPerceptRules as clauses."""
+    assert isinstance(percepts, list), "Percepts must be a list."
+    assert len(percepts) == 4, "Percepts must be a length 4 list."
+
+    for wall_present, direction in zip(percepts, DIRECTIONS):
+        percept_var = builder.variable(blocked_str_map[direction], time=t)
+        builder.addClause([percept_var if wall_present else -percept_var])
+
+
+def pacphysicsClauses(builder: logic.ClauseBuilder, t: int, all_coords: List[Tuple], non_outer_wall_coords: List[Tuple], walls_grid: List[List] = None, sensorModel: Callable = None, successorAxioms: Callable = None) -> None:
+    """
+    pacphysicsAxioms as clauses; sensorModel and successorAxioms are clause generators
+    like sensorClauses and allLegalSuccessorClauses. Pacman's position uses the sequential
+    exactly one encoding, O(n) clauses instead of one for every pair of squares, so the
+    result is only equisatisfiable: it has auxiliary variables, which models leave out.
+    """
+    for (x, y) in all_coords:
+        builder.addClause([-builder.variable(wall_str, x, y), -builder.variable(pacman_str, x, y, time=t)])
+    builder.exactlyOne([builder.variable(pacman_str, x, y, time=t) for (x, y) in non_outer_wall_coords], 'sequential')
+    builder.exactlyOne([builder.variable(action, time=t) for action in DIRECTIONS], 'pairwise')
+    if sensorModel:
+        sensorModel(builder, t, non_outer_wall_coords)
+    if successorAxioms and t > 0:
+        successorAxioms(builder, t, walls_grid, non_outer_wall_coords)
+
 #______________________________________________________________________________
 # Various useful functions, are not needed for completing the project but may be useful for debugging
 
@@ -0,0 +1,152 @@
+# features.py
+# -----------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Vectorized features for evaluation functions.
+
+The food and capsule cells of a layout are kept as NumPy arrays, with tables
+of exp(-decay * distance) from every cell to each of them (see
+LayoutFeatures.forLayout), and a state's remaining food and capsules become
+boolean masks over them, so sums over every dot of a decayed Manhattan
+distance take one NumPy expression for one state or a whole batch of them.
+
+These sums are not added up in the order of the Python loops they replace,
+so they can differ from them in the last bits, which is enough to change
+ties between moves.  The evaluation functions of multiAgents.py therefore
+only use them when asked to (ReflexAgent with -a vectorized=1,
+betterVectorized).  Each state's sums are computed on their own row, so a
+state gets the same value whatever batch it is evaluated in.
+
+NumPy is optional: NUMPY_ENABLED is False without it and the evaluation
+functions in multiAgents.py fall back to their Python loops.
+"""
+
+from itertools import chain
+
+try:
+    import numpy
+    NUMPY_ENABLED = True
+except ImportError:
+    NUMPY_ENABLED = False
+
+LAYOUT_FEATURES_CACHE = {}
+
+
+class LayoutFeatures:
+    """
+    The cells of a layout that can hold food or capsules, as (n, 2) arrays.
+    """
+
+    def __init__(self, layout):
+        self.width, self.height = layout.width, layout.height
+        self.foodCells = numpy.array(layout.food.asList(), dtype=float).reshape(-1, 2)
+        self.foodIndices = self.cellIndices(self.foodCells)
+        self.capsules = list(layout.capsules)
+        self.capsuleCells = numpy.array(self.capsules, dtype=float).reshape(-1, 2)
+        allCells = numpy.array([(x, y) for x in range(self.width) for y in range(self.height)], dtype=float)
+        self.foodDistances = manhattanDistances(allCells, self.foodCells) # by cell index, see cellIndices
+        self.capsuleDistances = manhattanDistances(allCells, self.capsuleCells)
+        self.weights = {}
+
+    def cellIndices(self, positions):
+        """
+        Returns the row of each integer (x, y) position in the distance tables.
+        """
+        return positions[:, 0].astype(int) * self.height + positions[:, 1].astype(int)
+
+    def foodWeights(self, decay):
+        """
+        Returns exp(-decay * distance) from every cell (row) to every food
+        cell (column), computed once per decay.
+        """
+        if ('food', decay) not in self.weights:
+            self.weights[('food', decay)] = numpy.exp(-decay * self.foodDistances)
+        return self.weights[('food', decay)]
+
+    def capsuleWeights(self, decay):
+        """
+        Like foodWeights, for the capsule cells.
+        """
+        if ('capsule', decay) not in self.weights:
+            self.weights[('capsule', decay)] = numpy.exp(-decay * self.capsuleDistances)
+        return self.weights[('capsule', decay)]
+
+    def forLayout(layout):
+        """
+        Returns the features of layout, built once per layout text.
+        """
+        key = tuple(layout.layoutText)
+        if key not in LAYOUT_FEATURES_CACHE:
+            LAYOUT_FEATURES_CACHE[key] = LayoutFeatures(layout)
+        return LAYOUT_FEATURES_CACHE[key]
+    forLayout = staticmethod(forLayout)
+
+    def foodMasks(self, states):
+        """
+        Returns a (len(states), number of food cells) array, True where the
+        state still has that food.
+        """
+        cells = chain.from_iterable(chain.from_iterable(state.getFood().data for state in states))
+        grids = numpy.fromiter(cells, dtype=bool, count=len(states) * self.width * self.height)
+        return grids.reshape(len(states), -1)[:, self.foodIndices]
+
+    def capsuleMasks(self, states):
+        """
+        Like foodMasks, for the capsules.
+        """
+        return numpy.array([[capsule in state.getCapsules() for capsule in self.capsules]
+                            for state in states], dtype=bool).reshape(len(states), -1)
+
+
+def positions(states, agentIndex=0):
+    """
+    Returns the positions of one agent in every state as an (n, 2) array.
+    """
+    return numpy.array([state.data.agentStates[agentIndex].getPosition() for state in states],
+                       dtype=float).reshape(-1, 2)
+
+
+def ghostPositions(states):
+    """
+    Returns the positions of the ghosts in every state as an (n, ghosts, 2)
+    array.  All states must have the same number of agents.
+    """
+    return numpy.array([state.getGhostPositions() for state in states],
+                       dtype=float).reshape(len(states), -1, 2)
+
+
+def manhattanDistances(origins, cells):
+    """
+    Returns the (n, m) distances from each of the n origins to the m cells;
+    cells is either one (m, 2) array for all origins or (n, m, 2).
+    """
+    return numpy.abs(origins[:, None, :] - cells).sum(axis=2)
+
+
+def maskedSums(weights, masks):
+    """
+    Sums each row of weights over the entries where masks is True.
+    """
+    return (weights * masks).sum(axis=1)
+
+
+def decayedSums(distances, decay, masks=None):
+    """
+    Sums exp(-decay * distance) over each row of distances, counting only
+    the entries where masks is True.
+    """
+    weights = numpy.exp(-decay * distances)
+    if masks is not None:
+        weights = weights * masks
+    return weights.sum(axis=1)
@@ -21,6 +21,7 @@
 # For more info, see http://inst.eecs.berkeley.edu/~cs188/sp09/pacman.html
 
 from util import *
+import random
 import time
 import os
 import traceback
@@ -393,12 +394,40 @@ class Actions:
     getSuccessor = staticmethod(getSuccessor)
 
 
+# Random 64 bit keys for each state feature, drawn on first use.  A private
+# generator is used so that hashing never disturbs the game's random stream.
+ZOBRIST_KEYS = {}
+_ZOBRIST_RANDOM = random.Random(0x5EED)
+
+
+def zobristKey(feature):
+    """
+    Returns the random key of a hashable feature, e.g. ('food', (x, y)).
+    """
+    key = ZOBRIST_KEYS.get(feature)
+    if key is None:
+        key = ZOBRIST_KEYS[feature] = _ZOBRIST_RANDOM.getrandbits(64)
+    return key
+
+
+def agentZobristKey(agentIndex, agentState):
+    """
+    The key of everything GameStateData.__eq__ compares for one agent.
+    """
+    configuration = agentState.configuration
+    return zobristKey((agentIndex, configuration.pos, configuration.direction,
+                       agentState.scaredTimer))
+
+
 class GameStateData:
 
     def __init__(self, prevState=None):
         """
         Generates a new data packet by copying information from its predecessor.
         """
+        self._zobrist = None
+        self._sharedAgents = () # indices of agentStates still shared with the predecessor
+        self._sharedCapsules = False
         if prevState != None:
             self.food = prevState.food.shallowCopy()
             self.capsules = prevState.capsules[:]
@@ -406,6 +435,7 @@ class GameStateData:
             self.layout = prevState.layout
             self._eaten = prevState._eaten
             self.score = prevState.score
+            self._zobrist = prevState._zobrist
 
         self._foodEaten = None
         self._foodAdded = None
@@ -415,6 +445,45 @@ class GameStateData:
         self._win = False
         self.scoreChange = 0
 
+    def successorCopy(self):
+        """
+        Returns a data packet for a successor that shares the food, capsules
+        and agent states of this one instead of copying them.  Rules that
+        change a successor get what they change through writableAgentState and
+        writableCapsules, which copy it first; food is replaced, never edited.
+        """
+        data = GameStateData()
+        data.food = self.food
+        data.capsules = self.capsules
+        data.agentStates = self.agentStates
+        data.layout = self.layout
+        data._eaten = self._eaten
+        data.score = self.score
+        data._zobrist = self._zobrist
+        data._sharedAgents = set(range(len(self.agentStates)))
+        data._sharedCapsules = True
+        return data
+
+    def writableAgentState(self, index):
+        """
+        Returns agentStates[index], copied first if it is still shared.
+        """
+        if index in self._sharedAgents:
+            if len(self._sharedAgents) == len(self.agentStates): # so is the list
+                self.agentStates = self.agentStates[:]
+            self._sharedAgents.remove(index)
+            self.agentStates[index] = self.agentStates[index].copy()
+        return self.agentStates[index]
+
+    def writableCapsules(self):
+        """
+        Returns the capsule list, copied first if it is still shared.
+        """
+        if self._sharedCapsules:
+            self.capsules = self.capsules[:]
+            self._sharedCapsules = False
+        return self.capsules
+
     def deepCopy(self):
         state = GameStateData(self)
         state.food = self.food.deepCopy()
@@ -460,6 +529,56 @@ class GameStateData:
                 # hash(state)
         return int((hash(tuple(self.agentStates)) + 13*hash(self.food) + 113 * hash(tuple(self.capsules)) + 7 * hash(self.score)) % 1048575)
 
+    def __getstate__(self):
+        """
+        Zobrist keys are drawn lazily and so differ between processes: an
+        unpickled state recomputes its key from the receiving process's keys.
+        """
+        state = self.__dict__.copy()
+        state['_zobrist'] = None
+        return state
+
+    def getZobristKey(self):
+        """
+        Returns a 64 bit Zobrist hash of the agents, food, capsules and score:
+        the xor of one random key per feature.  Successors update it in place
+        of recomputing it (see updateZobristKey), so this is only a full pass
+        for states built without a predecessor.
+        """
+        if self._zobrist is None:
+            key = zobristKey(('score', self.score))
+            for index, agentState in enumerate(self.agentStates):
+                key ^= agentZobristKey(index, agentState)
+            for position in self.food.asList():
+                key ^= zobristKey(('food', position))
+            for position in self.capsules:
+                key ^= zobristKey(('capsule', position))
+            self._zobrist = key
+        return self._zobrist
+
+    def updateZobristKey(self, prevState):
+        """
+        Brings the key copied from prevState up to date after one move, xoring
+        out the features that changed and xoring in their new values.
+        """
+        if prevState._zobrist is None:
+            return
+        key = prevState._zobrist
+        for index, agentState in enumerate(self.agentStates):
+            prevAgentState = prevState.agentStates[index]
+            if agentState.configuration is not prevAgentState.configuration or \
+                    agentState.scaredTimer != prevAgentState.scaredTimer:
+                key ^= agentZobristKey(index, prevAgentState)
+                key ^= agentZobristKey(index, agentState)
+        if self._foodEaten != None:
+            key ^= zobristKey(('food', self._foodEaten))
+        if self._capsuleEaten != None:
+            key ^= zobristKey(('capsule', self._capsuleEaten))
+        if self.score != prevState.score:
+            key ^= zobristKey(('score', prevState.score))
+            key ^= zobristKey(('score', self.score))
+        self._zobrist = key
+
     def __str__(self):
         width, height = self.layout.width, self.layout.height
         map = Grid(width, height)
@@ -560,6 +679,7 @@ class Game:
         self.muteAgents = muteAgents
         self.catchExceptions = catchExceptions
         self.moveHistory = []
+        self.recorder = None  # e.g. a replay.ReplayWriter, told about every move
         self.totalAgentTimes = [0 for agent in agents]
         self.totalAgentTimeWarnings = [0 for agent in agents]
         self.agentTimeout = False
@@ -745,6 +865,8 @@ class Game:
                     return
             else:
                 self.state = self.state.generateSuccessor(agentIndex, action)
+            if self.recorder != None:
+                self.recorder.recordMove(agentIndex, action, self.state)
 
             # Change the display
             self.display.update(self.state.data)
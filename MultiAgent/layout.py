@@ -19,6 +19,7 @@ import random
 from functools import reduce
 
 VISIBILITY_MATRIX_CACHE = {}
+LAYOUT_TEXT_CACHE = {}
 
 
 class Layout:
@@ -39,6 +40,13 @@ class Layout:
         self.totalFood = len(self.food.asList())
         # self.initializeVisibilityMatrix()
 
+    def __reduce__(self):
+        """
+        Layouts pickle as their text, and every game state unpickled in one
+        process shares a single rebuilt Layout (see layoutFromText).
+        """
+        return (layoutFromText, (tuple(self.layoutText),))
+
     def getNumGhosts(self):
         return self.numGhosts
 
@@ -137,6 +145,16 @@ class Layout:
             self.numGhosts += 1
 
 
+def layoutFromText(layoutText):
+    """
+    Returns the Layout of layoutText (a tuple of rows), building it only the
+    first time it is asked for in this process.
+    """
+    if layoutText not in LAYOUT_TEXT_CACHE:
+        LAYOUT_TEXT_CACHE[layoutText] = Layout(list(layoutText))
+    return LAYOUT_TEXT_CACHE[layoutText]
+
+
 def getLayout(name, back=2):
     if name.endswith('.lay'):
         layout = tryToLoad('layouts/' + name)
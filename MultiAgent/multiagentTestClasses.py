@@ -178,6 +178,8 @@ class GradingAgent(Agent):
         # keep track of elapsed moves
         self.stepCount = 0
         self.seed = seed
+        # explored-state counts are graded, so make pacman keep them
+        GameState.setExploredTracking(True)
 
     def registerInitialState(self, state):
         if 'registerInitialState' in dir(self.studentAgent):
@@ -261,6 +263,7 @@ class PolyAgent(Agent):
         self.partialPlyBugLists = []
         self.seed = seed
         self.stepCount = 0
+        GameState.setExploredTracking(True)
 
     def select(self, list, indices):
         """
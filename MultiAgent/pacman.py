@@ -77,15 +77,23 @@ class GameState:
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions called
+    # static variable keeps track of which states have had successors generated,
+    # as Zobrist fingerprints; only filled while trackExplored is on (the
+    # autograder turns it on, pacman.py runs leave it off)
     explored = set()
+    trackExplored = False
 
     def getAndResetExplored():
-        tmp = GameState.explored.copy()
+        tmp = GameState.explored
         GameState.explored = set()
         return tmp
     getAndResetExplored = staticmethod(getAndResetExplored)
 
+    def setExploredTracking(enabled):
+        GameState.trackExplored = enabled
+        GameState.explored = set()
+    setExploredTracking = staticmethod(setExploredTracking)
+
     def getLegalActions(self, agentIndex=0):
         """
         Returns the legal actions for the agent specified.
@@ -107,8 +115,9 @@ class GameState:
         if self.isWin() or self.isLose():
             raise Exception('Can\'t generate a successor of a terminal state.')
 
-        # Copy current state
-        state = GameState(self)
+        # Share the current state; the rules copy what they change
+        state = GameState.__new__(GameState)
+        state.data = self.data.successorCopy()
 
         # Let agent's logic deal with its action's effects on the board
         if agentIndex == 0:  # Pacman is moving
@@ -121,7 +130,7 @@ class GameState:
         if agentIndex == 0:
             state.data.scoreChange += -TIME_PENALTY  # Penalty for waiting around
         else:
-            GhostRules.decrementTimer(state.data.agentStates[agentIndex])
+            GhostRules.decrementTimer(state.data.writableAgentState(agentIndex))
 
         # Resolve multi-agent effects
         GhostRules.checkDeath(state, agentIndex)
@@ -129,8 +138,10 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        state.data.updateZobristKey(self.data)
+        if GameState.trackExplored:
+            GameState.explored.add(self.getZobristKey())
+            GameState.explored.add(state.getZobristKey())
         return state
 
     def getLegalPacmanActions(self):
@@ -221,6 +232,17 @@ class GameState:
     def isWin(self):
         return self.data._win
 
+    def getZobristKey(self):
+        """
+        Returns a 64 bit hash of the state that is kept up to date
+        incrementally as successors are generated.  Equal states have equal
+        keys, and two different states share one with a chance of about
+        2**-64, so the key stands in for the state both in transposition
+        tables and in the explored set (a collision would only make the count
+        of explored states one lower).
+        """
+        return self.data.getZobristKey()
+
     #############################################
     #             Helper methods:               #
     # You shouldn't need to call these directly #
@@ -359,7 +381,7 @@ class PacmanRules:
         if action not in legal:
             raise Exception("Illegal action " + str(action))
 
-        pacmanState = state.data.agentStates[0]
+        pacmanState = state.data.writableAgentState(0)
 
         # Update Configuration
         vector = Actions.directionToVector(action, PacmanRules.PACMAN_SPEED)
@@ -389,11 +411,11 @@ class PacmanRules:
                 state.data._win = True
         # Eat capsule
         if(position in state.getCapsules()):
-            state.data.capsules.remove(position)
+            state.data.writableCapsules().remove(position)
             state.data._capsuleEaten = position
             # Reset all ghosts' scared timers
             for index in range(1, len(state.data.agentStates)):
-                state.data.agentStates[index].scaredTimer = SCARED_TIME
+                state.data.writableAgentState(index).scaredTimer = SCARED_TIME
     consume = staticmethod(consume)
 
 
@@ -425,7 +447,7 @@ class GhostRules:
         if action not in legal:
             raise Exception("Illegal ghost action " + str(action))
 
-        ghostState = state.data.agentStates[ghostIndex]
+        ghostState = state.data.writableAgentState(ghostIndex)
         speed = GhostRules.GHOST_SPEED
         if ghostState.scaredTimer > 0:
             speed /= 2.0
@@ -459,6 +481,7 @@ class GhostRules:
 
     def collide(state, ghostState, agentIndex):
         if ghostState.scaredTimer > 0:
+            ghostState = state.data.writableAgentState(agentIndex)
             state.data.scoreChange += 200
             GhostRules.placeGhost(state, ghostState)
             ghostState.scaredTimer = 0
@@ -543,7 +566,7 @@ def readCommand(argv):
     parser.add_option('-r', '--recordActions', action='store_true', dest='record',
                       help='Writes game histories to a file (named by the time they were played)', default=False)
     parser.add_option('--replay', dest='gameToReplay',
-                      help='A recorded game file (pickle) to replay', default=None)
+                      help='A recorded game file to replay, on the -l layout it was recorded on', default=None)
     parser.add_option('-a', '--agentArgs', dest='agentArgs',
                       help='Comma separated values sent to agent. e.g. "opt1=val1,opt2,opt3=val3"')
     parser.add_option('-x', '--numTraining', dest='numTraining', type='int',
@@ -554,6 +577,8 @@ def readCommand(argv):
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('--workers', dest='workers', type='int',
+                      help=default('Play the games in this many processes, without graphics'), default=0)
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -606,18 +631,14 @@ def readCommand(argv):
     args['record'] = options.record
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    args['workers'] = options.workers
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
         print('Replaying recorded game %s.' % options.gameToReplay)
-        import pickle
-        f = open(options.gameToReplay)
-        try:
-            recorded = pickle.load(f)
-        finally:
-            f.close()
-        recorded['display'] = args['display']
-        replayGame(**recorded)
+        import replay
+        recorded = replay.ReplayReader(options.gameToReplay, args['layout'])
+        replayGame(args['layout'], recorded.getMoves(), args['display'])
         sys.exit(0)
 
     return args
@@ -672,7 +693,10 @@ def replayGame(layout, actions, display):
     display.finish()
 
 
-def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, catchExceptions=False, timeout=30):
+def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, catchExceptions=False, timeout=30, workers=0):
+    if workers > 1:
+        return runGamesInParallel(layout, pacman, ghosts, numGames, record, numTraining, catchExceptions, timeout, workers)
+
     import __main__
     __main__.__dict__['_display'] = display
 
@@ -691,21 +715,49 @@ def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, c
             rules.quiet = False
         game = rules.newGame(layout, pacman, ghosts,
                              gameDisplay, beQuiet, catchExceptions)
-        game.run()
+        playGame(layout, game, i, record)
         if not beQuiet:
             games.append(game)
 
-        if record:
-            import time
-            import pickle
-            fname = ('recorded-game-%d' % (i + 1)) + \
-                '-'.join([str(t) for t in time.localtime()[1:6]])
-            f = file(fname, 'w')
-            components = {'layout': layout, 'actions': game.moveHistory}
-            pickle.dump(components, f)
-            f.close()
-
-    if (numGames-numTraining) > 0:
+    printGameStatistics(games)
+    return games
+
+
+def playGame(layout, game, i, record):
+    """
+    Runs game, the i-th of a run, and writes its moves to a recording (see
+    replay.py) as it is played if record is set.  The recording is closed
+    however the game ends, and removed if game.run raised.
+    """
+    if not record:
+        game.run()
+        return
+    startRecording(layout, game, i)
+    finished = False
+    try:
+        game.run()
+        finished = True
+    finally:
+        if finished:
+            game.recorder.close()
+        else:
+            game.recorder.discard()
+        game.recorder = None
+
+
+def startRecording(layout, game, i):
+    """
+    Makes game write its moves to a recording (see replay.py) as it is played.
+    """
+    import time
+    import replay
+    fname = ('recorded-game-%d' % (i + 1)) + \
+        '-'.join([str(t) for t in time.localtime()[1:6]])
+    game.recorder = replay.ReplayWriter(fname, layout, game.state.getNumAgents())
+
+
+def printGameStatistics(games):
+    if len(games) > 0:
         scores = [game.state.getScore() for game in games]
         wins = [game.state.isWin() for game in games]
         winRate = wins.count(True) / float(len(wins))
@@ -716,9 +768,57 @@ def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, c
         print('Record:       ', ', '.join(
             [['Loss', 'Win'][int(w)] for w in wins]))
 
+
+def runGamesInParallel(layout, pacman, ghosts, numGames, record, numTraining, catchExceptions, timeout, workers):
+    """
+    Plays the games of runGames in a pool of worker processes, without
+    graphics.  Every game gets its own random seed, drawn here, so a run
+    with -f is repeatable.  A line is printed for each game as it ends and
+    the usual statistics, in game order, once all have ended.
+
+    The layout and agents go along with every game, and each worker keeps
+    the copy that came with its first one, so learning agents do not share
+    what they learn between workers.  The games come back without their
+    agents and agent output, which stay in the workers.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    seeds = [random.randrange(2 ** 31) for i in range(numGames)]
+    games = [None] * numGames
+    setup = (layout, pacman, ghosts, catchExceptions, timeout)
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(_playGame, setup, seed, i, record)
+                   for i, seed in enumerate(seeds)]
+        indices = dict((future, i) for i, future in enumerate(futures))
+        for future in as_completed(futures):
+            i = indices[future]
+            game = games[i] = future.result()
+            if i >= numTraining:
+                print('Game %d/%d: %s Score: %d' % (i + 1, numGames,
+                      ['Loss', 'Win'][int(game.state.isWin())], game.state.data.score))
+    games = games[numTraining:]
+    printGameStatistics(games)
     return games
 
 
+_WORKER_GAME = None  # what the worker processes of runGamesInParallel play
+
+
+def _playGame(setup, seed, i, record):
+    global _WORKER_GAME
+    import textDisplay
+    if _WORKER_GAME is None:  # first game of this worker
+        _WORKER_GAME = setup
+    layout, pacman, ghosts, catchExceptions, timeout = _WORKER_GAME
+    random.seed(seed)
+    rules = ClassicGameRules(timeout)
+    game = rules.newGame(layout, pacman, ghosts,
+                         textDisplay.NullGraphics(), True, catchExceptions)
+    playGame(layout, game, i, record)
+    game.agents = []
+    game.agentOutput = []
+    return game
+
+
 if __name__ == '__main__':
     """
     The main function called when pacman.py is run
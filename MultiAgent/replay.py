@@ -0,0 +1,255 @@
+# replay.py
+# ---------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A compact, append-only file format for recorded games.
+
+A recording starts with a header:
+
+  MAGIC                        4 bytes
+  sha1 of the layout text     20 bytes
+  number of agents            varint
+  snapshot interval           varint
+
+followed by one record per move, each a varint.  A move by agent i is
+1 + 5 * i + the index of its action in ACTIONS, so a move of a game with
+four ghosts takes one byte.  A 0 starts a snapshot instead: a varint length
+and the state after all the moves so far (see encodeState).  The writer adds
+one every snapshot interval moves, which lets ReplayReader.getState(k) start
+from the last snapshot before move k instead of from the start of the game.
+
+The layout itself is not stored; the reader is given it and checks it
+against the hash.
+"""
+
+from game import Configuration
+from game import Directions
+from game import Grid
+import bisect
+import hashlib
+import os
+
+MAGIC = b'PMR1'
+ACTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]
+ACTION_CODES = dict((action, code) for code, action in enumerate(ACTIONS))
+SNAPSHOT_INTERVAL = 100
+
+
+def layoutDigest(layout):
+    return hashlib.sha1('\n'.join(layout.layoutText).encode()).digest()
+
+
+def encodeVarint(n):
+    """
+    Encodes a non-negative int 7 bits per byte, low bits first.
+
+    >>> encodeVarint(5), encodeVarint(300)
+    (b'\\x05', b'\\xac\\x02')
+    """
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def decodeVarint(data, offset):
+    """
+    Returns the int encoded at data[offset:] and the offset after it.
+
+    >>> decodeVarint(b'\\xac\\x02', 0)
+    (300, 2)
+    """
+    n = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        n |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return n, offset
+        shift += 7
+
+
+def encodeState(state):
+    """
+    Encodes what changes during a game: the score, the win/lose flags, each
+    agent's doubled position (scared ghosts move half steps), direction and
+    scared timer, the capsules and the food as one bit per cell.
+    """
+    data = state.data
+    score = int(data.score)
+    out = [encodeVarint(score * 2 if score >= 0 else -score * 2 - 1),
+           encodeVarint(int(data._win) + 2 * int(data._lose))]
+    for agentState in data.agentStates:
+        x, y = agentState.configuration.pos
+        out.append(encodeVarint(int(round(x * 2))) + encodeVarint(int(round(y * 2))) +
+                   encodeVarint(ACTION_CODES[agentState.configuration.direction]) +
+                   encodeVarint(agentState.scaredTimer))
+    out.append(encodeVarint(len(data.capsules)))
+    for x, y in data.capsules:
+        out.append(encodeVarint(x) + encodeVarint(y))
+    food = data.food
+    bits = 0
+    for x in range(food.width):
+        for y in range(food.height):
+            if food[x][y]:
+                bits |= 1 << (x * food.height + y)
+    out.append(encodeVarint(bits))
+    return b''.join(out)
+
+
+def decodeState(snapshot, initialState):
+    """
+    Rebuilds the state encoded by encodeState, in the game that started in
+    initialState.
+    """
+    def half(n):
+        return n // 2 if n % 2 == 0 else n / 2.0
+    state = initialState.deepCopy()
+    data = state.data
+    zigzag, offset = decodeVarint(snapshot, 0)
+    data.score = zigzag // 2 if zigzag % 2 == 0 else -(zigzag + 1) // 2
+    flags, offset = decodeVarint(snapshot, offset)
+    data._win, data._lose = bool(flags & 1), bool(flags & 2)
+    for agentState in data.agentStates:
+        x, offset = decodeVarint(snapshot, offset)
+        y, offset = decodeVarint(snapshot, offset)
+        code, offset = decodeVarint(snapshot, offset)
+        agentState.scaredTimer, offset = decodeVarint(snapshot, offset)
+        agentState.configuration = Configuration((half(x), half(y)), ACTIONS[code])
+    numCapsules, offset = decodeVarint(snapshot, offset)
+    data.capsules = []
+    for i in range(numCapsules):
+        x, offset = decodeVarint(snapshot, offset)
+        y, offset = decodeVarint(snapshot, offset)
+        data.capsules.append((x, y))
+    bits, offset = decodeVarint(snapshot, offset)
+    data.food = Grid(data.food.width, data.food.height)
+    for x in range(data.food.width):
+        for y in range(data.food.height):
+            data.food[x][y] = bool(bits >> (x * data.food.height + y) & 1)
+    data._zobrist = None
+    return state
+
+
+class ReplayWriter:
+    """
+    Appends a game to a recording as it is played: Game.run calls recordMove
+    after every move when the writer is its recorder.
+    """
+
+    def __init__(self, path, layout, numAgents, snapshotInterval=SNAPSHOT_INTERVAL):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.snapshotInterval = snapshotInterval
+        self.numMoves = 0
+        self.file.write(MAGIC + layoutDigest(layout) +
+                        encodeVarint(numAgents) + encodeVarint(snapshotInterval))
+
+    def recordMove(self, agentIndex, action, state):
+        """
+        Records that agentIndex took action, leading to state.
+        """
+        self.file.write(encodeVarint(1 + 5 * agentIndex + ACTION_CODES[action]))
+        self.numMoves += 1
+        if self.snapshotInterval > 0 and self.numMoves % self.snapshotInterval == 0:
+            snapshot = encodeState(state)
+            self.file.write(encodeVarint(0) + encodeVarint(len(snapshot)) + snapshot)
+
+    def close(self):
+        self.file.close()
+
+    def discard(self):
+        """
+        Closes and deletes the recording, e.g. of a game that did not finish.
+        """
+        self.file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class ReplayReader:
+    """
+    Reads a recording made by ReplayWriter on layout.  Opening it decodes
+    the move stream, which is cheap; states are only built on request.
+    """
+
+    def __init__(self, path, layout):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data[:4] != MAGIC:
+            raise Exception('%s is not a recorded game' % path)
+        if data[4:24] != layoutDigest(layout):
+            raise Exception('%s was recorded on a different layout' % path)
+        self.layout = layout
+        self.numAgents, offset = decodeVarint(data, 24)
+        self.snapshotInterval, offset = decodeVarint(data, offset)
+        self.moves = []
+        self.snapshotMoves = []  # move counts of the snapshots, ascending
+        self.snapshots = []  # their encoded states
+        while offset < len(data):
+            record, offset = decodeVarint(data, offset)
+            if record == 0:
+                length, offset = decodeVarint(data, offset)
+                self.snapshotMoves.append(len(self.moves))
+                self.snapshots.append(data[offset:offset + length])
+                offset += length
+            else:
+                agentIndex, code = divmod(record - 1, 5)
+                self.moves.append((agentIndex, ACTIONS[code]))
+
+    def __len__(self):
+        return len(self.moves)
+
+    def getMoves(self):
+        """
+        Returns the (agentIndex, action) moves of the game, like
+        Game.moveHistory.
+        """
+        return self.moves
+
+    def getInitialState(self):
+        from pacman import GameState
+        state = GameState()
+        state.initialize(self.layout, self.numAgents - 1)
+        return state
+
+    def getState(self, k):
+        """
+        Returns the state after the first k moves, replaying at most a
+        snapshot interval of moves.
+        """
+        if k < 0 or k > len(self.moves):
+            raise IndexError('the game has %d moves' % len(self.moves))
+        i = bisect.bisect_right(self.snapshotMoves, k) - 1
+        if i < 0:
+            state, start = self.getInitialState(), 0
+        else:
+            state, start = decodeState(self.snapshots[i], self.getInitialState()), self.snapshotMoves[i]
+        for agentIndex, action in self.moves[start:k]:
+            state = state.generateSuccessor(agentIndex, action)
+        return state
+
+    def states(self, start=0):
+        """
+        Yields the states after start, start + 1, ... moves up to the end.
+        """
+        state = self.getState(start)
+        yield state
+        for agentIndex, action in self.moves[start:]:
+            state = state.generateSuccessor(agentIndex, action)
+            yield state
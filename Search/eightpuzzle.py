@@ -14,76 +14,83 @@
 
 import search
 import random
+import collections
+import mmap
+import os
 
 # Module Classes
 
-class EightPuzzleState:
+def _moveTables(size):
     """
-    The Eight Puzzle is described in the course textbook on
-    page 64.
+    For every position of the blank on a size x size board, the legal moves
+    as (move, new blank position) pairs, in the order up, down, left, right.
+    """
+    tables = []
+    for blank in range(size * size):
+        row, col = divmod(blank, size)
+        moves = []
+        if(row != 0):
+            moves.append(('up', blank - size))
+        if(row != size - 1):
+            moves.append(('down', blank + size))
+        if(col != 0):
+            moves.append(('left', blank - 1))
+        if(col != size - 1):
+            moves.append(('right', blank + 1))
+        tables.append(tuple(moves))
+    return tuple(tables)
 
-    This class defines the mechanics of the puzzle itself.  The
-    task of recasting this puzzle as a search problem is left to
-    the EightPuzzleSearchProblem class.
+class SlidingPuzzleState:
+    """
+    A size x size sliding puzzle (the eight puzzle for size 3, the fifteen
+    puzzle for size 4).  The whole board is packed in one int, 4 bits per cell
+    in row-major order (cell i holds (packed >> 4 * i) & 15), so states are
+    compared and hashed as ints and a move is a table lookup plus two shifts.
+
+    Subclasses set SIZE (see EightPuzzleState and FifteenPuzzleState).
     """
+    __slots__ = ('packed', 'blank')
+    SIZE = None # the board is SIZE x SIZE
+    _MOVES = {} # size -> move table (see _moveTables)
 
     def __init__( self, numbers ):
         """
-          Constructs a new eight puzzle from an ordering of numbers.
-
-        numbers: a list of integers from 0 to 8 representing an
-          instance of the eight puzzle.  0 represents the blank
-          space.  Thus, the list
-
-            [1, 0, 2, 3, 4, 5, 6, 7, 8]
-
-          represents the eight puzzle:
-            -------------
-            | 1 |   | 2 |
-            -------------
-            | 3 | 4 | 5 |
-            -------------
-            | 6 | 7 | 8 |
-            ------------
-
-        The configuration of the puzzle is stored in a 2-dimensional
-        list (a list of lists) 'cells'.
+        numbers: a list of the integers from 0 to SIZE * SIZE - 1, row by row;
+          0 represents the blank space.
         """
-        self.cells = []
-        numbers = numbers[:] # Make a copy so as not to cause side-effects.
-        numbers.reverse()
-        for row in range( 3 ):
-            self.cells.append( [] )
-            for col in range( 3 ):
-                self.cells[row].append( numbers.pop() )
-                if self.cells[row][col] == 0:
-                    self.blankLocation = row, col
+        if self.SIZE is None or len(numbers) != self.SIZE * self.SIZE:
+            raise ValueError('%s needs %s numbers' % (self.__class__.__name__, self.SIZE and self.SIZE * self.SIZE))
+        self.packed = 0
+        for i, number in enumerate(numbers):
+            self.packed |= number << (4 * i)
+            if number == 0:
+                self.blank = i
+
+    def _fromPacked(self, packed, blank):
+        "A new state of the same class (and size) from its packed board"
+        state = object.__new__(self.__class__)
+        state.packed = packed
+        state.blank = blank
+        return state
+
+    def getSize(self):
+        return self.SIZE
+
+    def getNumbers(self):
+        "The numbers on the board, row by row"
+        return [(self.packed >> (4 * i)) & 15 for i in range(self.SIZE * self.SIZE)]
+
+    def _getMoves(self):
+        if self.SIZE not in SlidingPuzzleState._MOVES:
+            SlidingPuzzleState._MOVES[self.SIZE] = _moveTables(self.SIZE)
+        return SlidingPuzzleState._MOVES[self.SIZE][self.blank]
 
     def isGoal( self ):
         """
-          Checks to see if the puzzle is in its goal state.
-
-            -------------
-            |   | 1 | 2 |
-            -------------
-            | 3 | 4 | 5 |
-            -------------
-            | 6 | 7 | 8 |
-            -------------
-
-        >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]).isGoal()
-        True
-
-        >>> EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).isGoal()
-        False
+          Checks to see if the puzzle is in its goal state (the numbers in
+        increasing order, with the blank first).
         """
-        current = 0
-        for row in range( 3 ):
-            for col in range( 3 ):
-                if current != self.cells[row][col]:
-                    return False
-                current += 1
-        return True
+        return self.packed == goalPacked(self.SIZE)
 
     def legalMoves( self ):
         """
@@ -91,91 +98,73 @@ class EightPuzzleState:
 
         Moves consist of moving the blank space up, down, left or right.
         These are encoded as 'up', 'down', 'left' and 'right' respectively.
-
-        >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]).legalMoves()
-        ['down', 'right']
         """
-        moves = []
-        row, col = self.blankLocation
-        if(row != 0):
-            moves.append('up')
-        if(row != 2):
-            moves.append('down')
-        if(col != 0):
-            moves.append('left')
-        if(col != 2):
-            moves.append('right')
-        return moves
+        return [move for move, _ in self._getMoves()]
 
     def result(self, move):
         """
-          Returns a new eightPuzzle with the current state and blankLocation
+          Returns a new puzzle with the current state and blankLocation
         updated based on the provided move.
 
         The move should be a string drawn from a list returned by legalMoves.
-        Illegal moves will raise an exception, which may be an array bounds
-        exception.
+        Illegal moves raise an exception.
 
         NOTE: This function *does not* change the current object.  Instead,
         it returns a new object.
         """
-        row, col = self.blankLocation
-        if(move == 'up'):
-            newrow = row - 1
-            newcol = col
-        elif(move == 'down'):
-            newrow = row + 1
-            newcol = col
-        elif(move == 'left'):
-            newrow = row
-            newcol = col - 1
-        elif(move == 'right'):
-            newrow = row
-            newcol = col + 1
-        else:
-            raise "Illegal Move"
-
-        # Create a copy of the current eightPuzzle
-        newPuzzle = EightPuzzleState([0, 0, 0, 0, 0, 0, 0, 0, 0])
-        newPuzzle.cells = [values[:] for values in self.cells]
-        # And update it to reflect the move
-        newPuzzle.cells[row][col] = self.cells[newrow][newcol]
-        newPuzzle.cells[newrow][newcol] = self.cells[row][col]
-        newPuzzle.blankLocation = newrow, newcol
-
-        return newPuzzle
+        for legalMove, newBlank in self._getMoves():
+            if legalMove == move:
+                tile = (self.packed >> (4 * newBlank)) & 15
+                # The blank cell holds 0: the tile leaves newBlank and lands on the old blank
+                return self._fromPacked(self.packed - (tile << (4 * newBlank)) + (tile << (4 * self.blank)), newBlank)
+        raise ValueError("Illegal Move: " + str(move))
+
+    def getTilePositions(self):
+        "A list where entry t is the cell (row-major index) of tile t"
+        positions = [0] * (self.SIZE * self.SIZE)
+        packed = self.packed
+        for i in range(len(positions)):
+            positions[packed & 15] = i
+            packed >>= 4
+        return positions
+
+    # Compatibility with the list of lists representation
+    def _getCells(self):
+        size = self.SIZE
+        numbers = self.getNumbers()
+        return [numbers[row * size:(row + 1) * size] for row in range(size)]
+    cells = property(_getCells)
+
+    def _getBlankLocation(self):
+        return divmod(self.blank, self.SIZE)
+    blankLocation = property(_getBlankLocation)
 
     # Utilities for comparison and display
     def __eq__(self, other):
         """
-            Overloads '==' such that two eightPuzzles with the same configuration
+            Overloads '==' such that two puzzles with the same configuration
           are equal.
-
-          >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]) == \
-              EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).result('left')
-          True
         """
-        for row in range( 3 ):
-            if self.cells[row] != other.cells[row]:
-                return False
-        return True
+        if not isinstance(other, SlidingPuzzleState): return False
+        return self.packed == other.packed and self.SIZE == other.SIZE
 
     def __hash__(self):
-        return hash(str(self.cells))
+        return hash(self.packed)
 
     def __getAsciiString(self):
         """
           Returns a display string for the maze
         """
         lines = []
-        horizontalLine = ('-' * (13))
+        width = 2 if self.SIZE > 3 else 1
+        horizontalLine = ('-' * ((width + 3) * self.SIZE + 1))
         lines.append(horizontalLine)
         for row in self.cells:
             rowLine = '|'
             for col in row:
                 if col == 0:
                     col = ' '
-                rowLine = rowLine + ' ' + col.__str__() + ' |'
+                rowLine = rowLine + ' ' + col.__str__().rjust(width) + ' |'
             lines.append(rowLine)
             lines.append(horizontalLine)
         return '\n'.join(lines)
@@ -183,6 +172,207 @@ class EightPuzzleState:
     def __str__(self):
         return self.__getAsciiString()
 
+def goalPacked(size, cache={}):
+    "The packed board of the goal: 0 (the blank), 1, 2, ... row by row"
+    if size not in cache:
+        cache[size] = sum(number << (4 * number) for number in range(size * size))
+    return cache[size]
+
+class EightPuzzleState(SlidingPuzzleState):
+    """
+    The Eight Puzzle is described in the course textbook on
+    page 64.
+
+    This class defines the mechanics of the puzzle itself.  The
+    task of recasting this puzzle as a search problem is left to
+    the EightPuzzleSearchProblem class.
+
+      Constructs a new eight puzzle from an ordering of numbers.
+
+    numbers: a list of integers from 0 to 8 representing an
+      instance of the eight puzzle.  0 represents the blank
+      space.  Thus, the list
+
+        [1, 0, 2, 3, 4, 5, 6, 7, 8]
+
+      represents the eight puzzle:
+        -------------
+        | 1 |   | 2 |
+        -------------
+        | 3 | 4 | 5 |
+        -------------
+        | 6 | 7 | 8 |
+        ------------
+
+    The configuration is packed in a single int (see SlidingPuzzleState);
+    'cells' still returns it as a 2-dimensional list (a list of lists).
+
+    >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]).isGoal()
+    True
+
+    >>> EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).isGoal()
+    False
+
+    >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]).legalMoves()
+    ['down', 'right']
+
+    >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]) == \
+        EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).result('left')
+    True
+    """
+    __slots__ = ()
+    SIZE = 3
+
+class FifteenPuzzleState(SlidingPuzzleState):
+    """
+    The 4 x 4 version of the puzzle: numbers is a list of the integers from
+    0 to 15, row by row, with 0 for the blank.
+    """
+    __slots__ = ()
+    SIZE = 4
+
+# Pattern databases
+
+PATTERN_DATABASE_CACHE_DIR = None # a directory to keep the tables in across runs (off by default)
+DEFAULT_PATTERNS = { 3: ((1, 2, 3, 4), (5, 6, 7, 8)),
+                     4: ((1, 2, 3, 4), (5, 6, 7, 8), (9, 10, 11, 12), (13, 14, 15)) }
+PATTERN_DATABASES = {} # (size, patterns) -> AdditivePatternDatabase
+
+class PatternDatabase:
+    """
+    The exact number of moves of the tiles in 'pattern' needed to bring them
+    to their goal cells, for every placement of those tiles on the board; the
+    other tiles are indistinguishable and moving them is free.  Since moves of
+    tiles outside the pattern don't count, databases over disjoint patterns can
+    be added together and stay admissible.
+
+    The table is computed by a 0-1 breadth first search backwards from the goal
+    and has one byte per placement, indexed by the cells of the tiles read as a
+    number in base size * size.  If a cache directory is given (or
+    PATTERN_DATABASE_CACHE_DIR is set) it is saved there and memory-mapped when
+    it is needed again.
+    """
+    MAGIC = b'PDB1'
+    UNKNOWN = 255
+
+    def __init__(self, size, pattern, cacheDirectory=None):
+        if cacheDirectory is None:
+            cacheDirectory = PATTERN_DATABASE_CACHE_DIR
+        self.size = size
+        self.pattern = tuple(pattern)
+        self.cells = size * size
+        self.table = None
+        cacheFile = None
+        if cacheDirectory is not None:
+            cacheFile = os.path.join(cacheDirectory, 'pdb-%d-%s.bin' % (size, '-'.join(str(tile) for tile in self.pattern)))
+            self.table = self._load(cacheFile)
+        if self.table is None:
+            self.table = self._compute()
+            if cacheFile is not None:
+                self._save(cacheFile)
+
+    def getIndex(self, positions):
+        "The index of the placement where tile t is on cell positions[t]"
+        index = 0
+        for tile in self.pattern:
+            index = index * self.cells + positions[tile]
+        return index
+
+    def getValue(self, positions):
+        return self.table[self.getIndex(positions)]
+
+    def _compute(self):
+        cells, k = self.cells, len(self.pattern)
+        moves = _moveTables(self.size)
+        table = bytearray([self.UNKNOWN]) * (cells ** k)
+        # An abstract state is (cells of the pattern tiles, cell of the blank)
+        start = (tuple(self.pattern), 0) # in the goal tile t is on cell t and the blank on cell 0
+        distance = {start: 0}
+        done = set()
+        frontier = collections.deque([start]) # 0-1 bfs: free moves go to the front
+        while frontier:
+            state = frontier.popleft()
+            if state in done: continue
+            done.add(state)
+            tiles, blank = state
+            d = distance[state]
+            index = 0
+            for cell in tiles:
+                index = index * cells + cell
+            if table[index] > d:
+                table[index] = d
+            for _, newBlank in moves[blank]:
+                if newBlank in tiles: # a pattern tile slides into the blank: costs one move
+                    nextTiles = tuple(blank if cell == newBlank else cell for cell in tiles)
+                    nextState, cost = (nextTiles, newBlank), 1
+                else:
+                    nextState, cost = (tiles, newBlank), 0
+                if nextState not in distance or distance[nextState] > d + cost:
+                    distance[nextState] = d + cost
+                    if cost == 0:
+                        frontier.appendleft(nextState)
+                    else:
+                        frontier.append(nextState)
+        return table
+
+    def _load(self, cacheFile):
+        "Memory-maps a saved table, or returns None if there is no usable one"
+        try:
+            with open(cacheFile, 'rb') as f:
+                table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if table[:len(self.MAGIC)] != self.MAGIC or len(table) != len(self.MAGIC) + self.cells ** len(self.pattern):
+            table.close()
+            return None
+        return memoryview(table)[len(self.MAGIC):]
+
+    def _save(self, cacheFile):
+        "Saves the table; the cache is only an optimization, so failures are ignored"
+        try:
+            os.makedirs(os.path.dirname(cacheFile), exist_ok=True)
+            temporaryFile = '%s.%d.tmp' % (cacheFile, os.getpid())
+            with open(temporaryFile, 'wb') as f:
+                f.write(self.MAGIC)
+                f.write(self.table)
+            os.replace(temporaryFile, cacheFile)
+        except OSError:
+            pass
+
+class AdditivePatternDatabase:
+    """
+    The sum of the pattern databases of disjoint groups of tiles, an admissible
+    and consistent heuristic for the sliding puzzle of the given size.
+    """
+    def __init__(self, size, patterns=None, cacheDirectory=None):
+        self.size = size
+        self.patterns = tuple(tuple(pattern) for pattern in (patterns or DEFAULT_PATTERNS[size]))
+        tiles = [tile for pattern in self.patterns for tile in pattern]
+        if len(tiles) != len(set(tiles)) or 0 in tiles:
+            raise ValueError('The patterns must be disjoint groups of tiles (not the blank)')
+        self.databases = [PatternDatabase(size, pattern, cacheDirectory) for pattern in self.patterns]
+
+    def getValue(self, state):
+        positions = state.getTilePositions()
+        return sum(database.getValue(positions) for database in self.databases)
+
+def getPatternDatabase(size, patterns=None, cacheDirectory=None):
+    "Returns the (shared) additive pattern database of a puzzle size"
+    key = (size, patterns and tuple(tuple(pattern) for pattern in patterns))
+    if key not in PATTERN_DATABASES:
+        PATTERN_DATABASES[key] = AdditivePatternDatabase(size, patterns, cacheDirectory)
+    return PATTERN_DATABASES[key]
+
+def patternDatabaseHeuristic(state, problem=None):
+    """
+    An additive pattern database heuristic for EightPuzzleSearchProblem (and
+    its fifteen puzzle version), e.g. search.aStarSearch(problem,
+    patternDatabaseHeuristic).  The databases are built the first time a
+    puzzle size is seen, or loaded from the cacheDir of the problem if an
+    earlier run saved them there.
+    """
+    return getPatternDatabase(state.getSize(), cacheDirectory=getattr(problem, 'cacheDir', None)).getValue(state)
+
 # TODO: Implement The methods in this class
 
 class EightPuzzleSearchProblem(search.SearchProblem):
@@ -190,13 +380,17 @@ class EightPuzzleSearchProblem(search.SearchProblem):
       Implementation of a SearchProblem for the  Eight Puzzle domain
 
       Each state is represented by an instance of an eightPuzzle.
+
+      cacheDir is a directory where patternDatabaseHeuristic keeps its tables
+      across runs; without it nothing is written to disk.
     """
-    def __init__(self,puzzle):
+    def __init__(self,puzzle,cacheDir=None):
         "Creates a new EightPuzzleSearchProblem which stores search information."
         self.puzzle = puzzle
+        self.cacheDir = cacheDir
 
     def getStartState(self):
-        return puzzle
+        return self.puzzle
 
     def isGoalState(self,state):
         return state.isGoal()
@@ -256,7 +450,14 @@ def createRandomEightPuzzle(moves=100):
       a series of 'moves' random moves to a solved
       puzzle.
     """
-    puzzle = EightPuzzleState([0,1,2,3,4,5,6,7,8])
+    return createRandomPuzzle(EightPuzzleState, moves)
+
+def createRandomFifteenPuzzle(moves=100):
+    "Creates a random fifteen puzzle, like createRandomEightPuzzle"
+    return createRandomPuzzle(FifteenPuzzleState, moves)
+
+def createRandomPuzzle(puzzleClass, moves=100):
+    puzzle = puzzleClass(list(range(puzzleClass.SIZE * puzzleClass.SIZE)))
     for i in range(moves):
         # Execute a random legal move
         puzzle = puzzle.result(random.sample(puzzle.legalMoves(), 1)[0])
@@ -190,6 +190,7 @@ class Grid:
 
     def __eq__(self, other):
         if other == None: return False
+        if isinstance(other, BitGrid): return other == self
         return self.data == other.data
 
     def __hash__(self):
@@ -274,6 +275,147 @@ class Grid:
                 bools.append(False)
         return bools
 
+class BitGrid:
+    """
+    A drop-in replacement for Grid that stores its cells as the bits of one
+    Python int: the bit of cell (x,y) is x * height + y, the cell order of
+    packBits.  Copies share the (immutable) int, so copy() is O(1), count()
+    is a popcount and the hash of the grid is the hash of the int (the same
+    value as the hash of the equivalent Grid).
+
+    Cells are still accessed via grid[x][y], and asList()/packBits() return
+    the same values as for a Grid.  Only booleans can be stored.
+    """
+    def __init__(self, width, height, initialValue=False, bitRepresentation=None):
+        if initialValue not in [False, True]: raise Exception('Grids can only contain booleans')
+        self.CELLS_PER_INT = 30
+
+        self.width = width
+        self.height = height
+        self.bits = (1 << (width * height)) - 1 if initialValue else 0
+        if bitRepresentation:
+            self._unpackBits(bitRepresentation)
+
+    def fromGrid(grid):
+        "Returns a BitGrid with the same cells as a Grid"
+        g = BitGrid(grid.width, grid.height)
+        bits, bit = 0, 1
+        for column in grid.data:
+            for cell in column:
+                if cell:
+                    bits |= bit
+                bit <<= 1
+        g.bits = bits
+        return g
+    fromGrid = staticmethod(fromGrid)
+
+    def __getitem__(self, i):
+        return _BitGridColumn(self, i)
+
+    def isSet(self, x, y):
+        return (self.bits >> (x * self.height + y)) & 1 == 1
+
+    def set(self, x, y):
+        self.bits |= 1 << (x * self.height + y)
+
+    def clear(self, x, y):
+        self.bits &= ~(1 << (x * self.height + y))
+
+    def __str__(self):
+        out = [[str(self.isSet(x, y))[0] for x in range(self.width)] for y in range(self.height)]
+        out.reverse()
+        return '\n'.join([''.join(x) for x in out])
+
+    def __eq__(self, other):
+        if other == None: return False
+        if not isinstance(other, BitGrid):
+            if not isinstance(other, Grid): return False
+            other = BitGrid.fromGrid(other)
+        return self.bits == other.bits and self.width == other.width and self.height == other.height
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def copy(self):
+        g = BitGrid(self.width, self.height)
+        g.bits = self.bits
+        return g
+
+    def deepCopy(self):
+        return self.copy()
+
+    def shallowCopy(self):
+        return self.copy()
+
+    def count(self, item =True ):
+        ones = bin(self.bits).count('1')
+        if item: return ones
+        return self.width * self.height - ones
+
+    def asList(self, key = True):
+        bits = self.bits if key else ~self.bits & ((1 << (self.width * self.height)) - 1)
+        list = []
+        while bits:
+            lowest = bits & -bits
+            index = lowest.bit_length() - 1
+            list.append( (index // self.height, index % self.height) )
+            bits ^= lowest
+        return list
+
+    def packBits(self):
+        """
+        Returns an efficient int list representation
+
+        (width, height, bitPackedInts...)
+        """
+        bits = [self.width, self.height]
+        currentInt = 0
+        for i in range(self.height * self.width):
+            bit = self.CELLS_PER_INT - (i % self.CELLS_PER_INT) - 1
+            if (self.bits >> i) & 1:
+                currentInt += 2 ** bit
+            if (i + 1) % self.CELLS_PER_INT == 0:
+                bits.append(currentInt)
+                currentInt = 0
+        bits.append(currentInt)
+        return tuple(bits)
+
+    def _unpackBits(self, bits):
+        """
+        Fills in data from a bit-level representation
+        """
+        cell = 0
+        for packed in bits:
+            for i in range(self.CELLS_PER_INT):
+                if cell == self.width * self.height: break
+                if packed & (1 << (self.CELLS_PER_INT - i - 1)):
+                    self.bits |= 1 << cell
+                else:
+                    self.bits &= ~(1 << cell)
+                cell += 1
+
+class _BitGridColumn:
+    "The column x of a BitGrid, so that grid[x][y] can be read and assigned"
+    __slots__ = ('grid', 'x')
+
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.x = x
+
+    def __getitem__(self, y):
+        if y < 0 or y >= self.grid.height: raise IndexError('grid index out of range')
+        return self.grid.isSet(self.x, y)
+
+    def __setitem__(self, y, value):
+        if y < 0 or y >= self.grid.height: raise IndexError('grid index out of range')
+        if value:
+            self.grid.set(self.x, y)
+        else:
+            self.grid.clear(self.x, y)
+
+    def __len__(self):
+        return self.grid.height
+
 def reconstituteGrid(bitRep):
     if type(bitRep) is not type((1,2)):
         return bitRep
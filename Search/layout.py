@@ -14,6 +14,7 @@
 
 from util import manhattanDistance
 from game import Grid
+from game import Directions, Actions
 import os
 import random
 from functools import reduce
@@ -36,6 +37,7 @@ class Layout:
         self.processLayoutText(layoutText)
         self.layoutText = layoutText
         self.totalFood = len(self.food.asList())
+        self.adjacency = None
         # self.initializeVisibilityMatrix()
 
     def getNumGhosts(self):
@@ -62,6 +64,12 @@ class Layout:
         else:
             self.visibility = VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)]
 
+    def getAdjacency(self):
+        "Returns the MazeAdjacency of the walls, compiled on first use"
+        if self.adjacency is None:
+            self.adjacency = MazeAdjacency(self.walls)
+        return self.adjacency
+
     def isWall(self, pos):
         x, col = pos
         return self.walls[x][col]
@@ -129,6 +137,29 @@ class Layout:
         elif layoutChar in  ['1', '2', '3', '4']:
             self.agentPositions.append( (int(layoutChar), (x,y)))
             self.numGhosts += 1
+class MazeAdjacency:
+    """
+    The legal moves between the open cells of a maze, compiled once from its
+    walls Grid and shared by every search problem on the layout: moves[(x,y)]
+    is a tuple of (action, nextPosition) pairs, in the NORTH, SOUTH, EAST, WEST
+    order.  Walls have no entry.
+    """
+    MOVE_ORDER = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+
+    def __init__(self, walls):
+        self.moves = {}
+        for x in range(walls.width):
+            for y in range(walls.height):
+                if walls[x][y]:
+                    continue
+                cellMoves = []
+                for action in self.MOVE_ORDER:
+                    dx, dy = Actions.directionToVector(action)
+                    nextx, nexty = int(x + dx), int(y + dy)
+                    if not walls[nextx][nexty]:
+                        cellMoves.append((action, (nextx, nexty)))
+                self.moves[(x, y)] = tuple(cellMoves)
+
 def getLayout(name, back = 2):
     if name.endswith('.lay'):
         layout = tryToLoad('layouts/' + name)
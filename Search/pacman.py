@@ -200,6 +200,16 @@ class GameState:
         """
         return self.data.layout.walls
 
+    def getAdjacency(self):
+        """
+        Returns the MazeAdjacency of the layout (see layout.py): the legal
+        moves out of every open cell, compiled once per layout.
+
+        adjacency = state.getAdjacency()
+        for action, (x, y) in adjacency.moves[state.getPacmanPosition()]: ...
+        """
+        return self.data.layout.getAdjacency()
+
     def hasFood(self, x, y):
         return self.data.food[x][y]
 
@@ -74,60 +74,132 @@ def tinyMazeSearch(problem):
     w = Directions.WEST
     return  [s, s, w, s, w, w, s, w]
 
-def depthFirstSearch(problem: SearchProblem()):
-    frontier = util.Stack() #the frontier is a stack since we want to explore the deepest node in the graph
-    visited = [] #we need to know which nodes have been visited so we dont check them again
-    Actions = [] #a list of the actions that lead to our goal
-    frontier.push((problem.getStartState(),Actions)) #add the starting state along with the empty list of actions in the stack
-    while(not frontier.isEmpty()): #while the frontier is not empty
-        node , actions  = frontier.pop() #pop the last item from the stack
-        if not node in visited: #check if it has been visited before
-            visited.append(node) #add it to the visited list so we dont check it again
-            if(problem.isGoalState(node)): #if it is our goal
-                return actions #return the list of actions that lead to it
-            else:
-                Successors = problem.getSuccessors(node) #get the successors of the current node
-                for items in Successors: #check all of them(the node might have more than one)
-                    newnode,path,value = items #each successor node returns the node name ,the path to the node from our current one and the cost(but the DFS doesnt care about costs)
-                    newactions = actions + [path] #create the path to the current node
-                    frontier.push((newnode,newactions)) #add it to the frontier so it is explored later
+class SearchNode:
+    """
+    A node of the search tree.  Instead of carrying the whole list of actions
+    that leads to it, a node only points back to its parent, so pushing a
+    successor is O(1) and the plan is rebuilt once, when a goal is popped.
+    The cost of the path (g) is accumulated from the step costs on the way.
+    """
+    __slots__ = ('state', 'parent', 'action', 'depth', 'pathCost')
 
-def breadthFirstSearch(problem: SearchProblem):
-    frontier = util.Queue() #the frontier is a queue since we want to check by breadth and not depth(bfs is similar to dfs,the only thing that changes is how the frontier is handled)
-    visited = [] #we need to know which nodes have been visited so we dont check them again
-    Actions = [] #a list of the actions that lead to our goal
-    frontier.push((problem.getStartState(), Actions)) #add the starting state along with the empty list of actions in the queue
-    while(not frontier.isEmpty()): #while the frontier is not empty
-        node , actions  = frontier.pop() #pop the frist item from the queue
-        if not node in visited: #check if it has been visited before
-            visited.append(node) #add it to the visited list so we dont check it again
-            if(problem.isGoalState(node)): #if it is our goal
-                return actions #return the list of actions that lead to it
-            else:
-                Successors = problem.getSuccessors(node) #get the successors of the current node
-                for items in Successors: #check all of them(the node might have more than one)
-                    newnode,path,value = items #each successor node returns the node name ,the path to the node from our current one and the cost(but the BFS doesnt care about costs)
-                    newactions = actions + [path] #create the path to the current node
-                    frontier.push((newnode,newactions)) #add it to the frontier so it is explored later
+    def __init__(self, state, parent=None, action=None, stepCost=0):
+        self.state = state
+        self.parent = parent
+        self.action = action
+        if parent is None:
+            self.depth, self.pathCost = 0, 0
+        else:
+            self.depth, self.pathCost = parent.depth + 1, parent.pathCost + stepCost
+
+    def getActions(self):
+        "Returns the list of actions that leads from the root to this node"
+        actions = [None] * self.depth
+        node = self
+        while node.parent is not None: #walk the parent pointers back to the root
+            actions[node.depth - 1] = node.action
+            node = node.parent
+        return actions
+
+class SearchStatistics:
+    """
+    Counters of the last search run through graphSearch: the number of nodes
+    expanded and the largest size the frontier reached.
+    """
+    def __init__(self):
+        self.expanded = 0
+        self.maxFrontier = 0
 
+    def __str__(self):
+        return 'expanded %d nodes, peak frontier %d' % (self.expanded, self.maxFrontier)
+
+lastSearchStatistics = SearchStatistics()
+
+def graphSearch(problem: SearchProblem, frontier):
+    """
+    The search engine shared by all the graph searches below.  The frontier
+    decides the order of expansion (a Stack for dfs or a Queue for bfs) and
+    holds SearchNodes.  A state is closed when it is popped, so the expansion
+    order is the one of the classic list based implementation, but membership
+    in the closed set is a hash lookup.
+
+    Returns the list of actions to the first goal popped, or None.  The
+    counters of the search are left in lastSearchStatistics once it returns.
+    """
+    global lastSearchStatistics
+    stats = SearchStatistics() #published only when done, so nested searches (e.g. in heuristics) don't clobber it
+    visited = set() #the states that have already been expanded
+    frontier.push(SearchNode(problem.getStartState()))
+    stats.maxFrontier = 1
+    while not frontier.isEmpty():
+        node = frontier.pop()
+        state = node.state
+        if state in visited: #an earlier copy of this state was already expanded
+            continue
+        visited.add(state)
+        if problem.isGoalState(state):
+            lastSearchStatistics = stats
+            return node.getActions() #rebuild the path only once, for the goal
+        stats.expanded += 1
+        for successor, action, stepCost in problem.getSuccessors(state):
+            if successor not in visited:
+                frontier.push(SearchNode(successor, node, action, stepCost))
+        if len(frontier) > stats.maxFrontier:
+            stats.maxFrontier = len(frontier)
+    lastSearchStatistics = stats
+    return None
+
+def bestFirstSearch(problem: SearchProblem, priorityFunction):
+    """
+    The engine for the searches ordered by a priority (ucs/astar).  The frontier
+    is an indexed util.PriorityQueue of states, so every state is queued at most
+    once; bestNode holds the cheapest known node (path cost g) of each queued
+    state.  A successor only replaces the queued entry of its state if it comes
+    with a cheaper path, which is a decrease-key on the queue.
+
+      priorityFunction: (node) -> priority, computed once per pushed node
+    """
+    global lastSearchStatistics
+    stats = SearchStatistics()
+    visited = set() #the states that have already been expanded
+    bestNode = {} #the cheapest known node of every state in the frontier
+    frontier = util.PriorityQueue()
+    root = SearchNode(problem.getStartState())
+    bestNode[root.state] = root
+    frontier.push(root.state, priorityFunction(root))
+    stats.maxFrontier = 1
+    while not frontier.isEmpty():
+        state = frontier.pop()
+        node = bestNode.pop(state)
+        visited.add(state)
+        if problem.isGoalState(state):
+            lastSearchStatistics = stats
+            return node.getActions()
+        stats.expanded += 1
+        for successor, action, stepCost in problem.getSuccessors(state):
+            if successor in visited:
+                continue
+            queued = bestNode.get(successor)
+            if queued is not None and queued.pathCost <= node.pathCost + stepCost:
+                continue #we already have a path to it that is at least as cheap
+            child = SearchNode(successor, node, action, stepCost)
+            bestNode[successor] = child
+            frontier.push(successor, priorityFunction(child)) #decrease-key if it was already queued
+        if len(frontier) > stats.maxFrontier:
+            stats.maxFrontier = len(frontier)
+    lastSearchStatistics = stats
+    return None
+
+def depthFirstSearch(problem: SearchProblem):
+    return graphSearch(problem, util.Stack()) #the frontier is a stack since we want to explore the deepest node in the graph
+
+def breadthFirstSearch(problem: SearchProblem):
+    return graphSearch(problem, util.Queue()) #the frontier is a queue since we want to check by breadth and not depth
 
 def uniformCostSearch(problem: SearchProblem):
-    frontier = util.PriorityQueue() #frontier is a priority queue with a min heap(it returns the element with the least priority)
-    visited = []#we need to know which nodes have been visited so we dont check them again
-    Actions = []#a list of the actions that lead to our goal
-    frontier.push((problem.getStartState(),Actions),problem.getCostOfActions(Actions))#add the starting state along with the empty list of actions in the priority queue
-    while(not frontier.isEmpty()): #while the frontier is not empty
-        node , actions  = frontier.pop() #pop the item with the least priority from the queue
-        if not node in visited: #check if it has been visited before
-            visited.append(node) #add it to the visited list so we dont check it again
-            if(problem.isGoalState(node)): #if it is our goal
-                return actions #return the list of actions that lead to it
-            else:
-                Successors = problem.getSuccessors(node) #get the successors of the current node
-                for items in Successors: #check all of them(the node might have more than one)
-                    newnode,path,value = items #each successor node returns the node name ,the path to the node from our current one and the cost(the cost is the priority but we dont need it here,since we get the total cost of all the actions leading to the current node,from the getCostOfActions())
-                    newactions = actions + [path] #create the path to the current node
-                    frontier.push((newnode,newactions),problem.getCostOfActions(newactions)) #add it to the frontier so it is explored later
+    #the priority of a node is the total cost of the actions leading to it
+    priority = lambda node: node.pathCost
+    return bestFirstSearch(problem, priority)
 
 def nullHeuristic(state, problem=None):
     """
@@ -137,23 +209,350 @@ def nullHeuristic(state, problem=None):
     return 0
 
 def aStarSearch(problem: SearchProblem, heuristic=nullHeuristic):
-    frontier = util.PriorityQueue() #frontier is a priority queue that returns the item we the least heuristic value
-    visited = []#we need to know which nodes have been visited so we dont check them again
-    Actions = []#a list of the actions that lead to our goal
-    frontier.push((problem.getStartState(),Actions),heuristic(problem.getStartState(),problem))#add the starting state along with the empty list of actions in the priority queue
-    while(not frontier.isEmpty()): #while the frontier is not empty
-        node , actions  = frontier.pop() #pop the item with the least priority from the queue
-        if not node in visited: #check if it has been visited before
-            visited.append(node) #add it to the visited list so we dont check it again
-            if(problem.isGoalState(node)): #if it is our goal
-                return actions #return the list of actions that lead to it
-            else:
-                Successors = problem.getSuccessors(node) #get the successors of the current node
-                for items in Successors: #check all of them(the node might have more than one)
-                    newnode,path,value = items #each successor node returns the node name ,the path to the node from our current one and the cost(the cost is the priority but we dont need it here,since we get the total cost of all the actions leading to the current node,from the getCostOfActions())
-                    newactions = actions + [path] #create the path to the current node
-                    totalcost = problem.getCostOfActions(newactions) + heuristic(newnode,problem) #calculate the total cost by getting the cost of the total actions needed to get to this node plus the heuristic value of the node
-                    frontier.push((newnode,newactions),totalcost) #add it to the frontier so it is explored later
+    #the priority of a node is the cost of the actions leading to it plus the heuristic value of its state
+    priority = lambda node: node.pathCost + heuristic(node.state, problem)
+    return bestFirstSearch(problem, priority)
+
+class ReversedProblem:
+    """
+    A view of a problem for the backward half of a bidirectional search: the
+    goal becomes the start state, so heuristics that estimate the distance to
+    problem.goal (e.g. manhattanHeuristic) estimate the distance to the start.
+    Everything else is read from the original problem.
+    """
+    def __init__(self, problem):
+        self.problem = problem
+        self.goal = problem.getStartState()
+
+    def __getattr__(self, name):
+        return getattr(self.problem, name)
+
+def getPredecessors(problem: SearchProblem, state):
+    """
+    Returns (predecessor, action, stepCost) triples, where 'action' is the move
+    from 'predecessor' to 'state'.  Uses problem.getPredecessors if the problem
+    has one; otherwise the moves are assumed reversible with symmetric costs.
+    """
+    if hasattr(problem, 'getPredecessors'):
+        return problem.getPredecessors(state)
+    return [(previous, Actions.reverseDirection(action), stepCost) for previous, action, stepCost in problem.getSuccessors(state)]
+
+def _getGoalState(problem: SearchProblem):
+    goal = getattr(problem, 'goal', None)
+    if goal is None:
+        raise AttributeError('bidirectional search needs a problem with a single goal state in problem.goal')
+    return goal
+
+def _joinPaths(forwardNode, backwardNode):
+    "The actions from the start to the meeting state, then from there to the goal"
+    actions = forwardNode.getActions()
+    node = backwardNode
+    while node.parent is not None: #backward nodes point towards the goal
+        actions.append(node.action)
+        node = node.parent
+    return actions
+
+def bidirectionalSearch(problem: SearchProblem):
+    """
+    Breadth first search from the start and (over reversed moves) from
+    problem.goal at the same time, one whole layer at a time from the side with
+    the smaller frontier, until the two searches meet in the middle.  Finishing
+    the layer in which they meet keeps the path as short as the one of bfs.
+    """
+    global lastSearchStatistics
+    stats = SearchStatistics()
+    start, goal = problem.getStartState(), _getGoalState(problem)
+    forward, backward = {start: SearchNode(start)}, {goal: SearchNode(goal)} #the states reached by each side
+    forwardLayer, backwardLayer = [start], [goal]
+    meeting = start if start == goal else None
+    while meeting is None and forwardLayer and backwardLayer:
+        stats.maxFrontier = max(stats.maxFrontier, len(forwardLayer) + len(backwardLayer))
+        if len(forwardLayer) <= len(backwardLayer): #expand the smaller side
+            layer, reached, other, expand = forwardLayer, forward, backward, problem.getSuccessors
+        else:
+            layer, reached, other, expand = backwardLayer, backward, forward, lambda state: getPredecessors(problem, state)
+        nextLayer = []
+        for state in layer:
+            stats.expanded += 1
+            for successor, action, stepCost in expand(state):
+                if successor in reached:
+                    continue
+                reached[successor] = SearchNode(successor, reached[state], action)
+                nextLayer.append(successor)
+                if successor in other: #the two searches met,keep the shortest meeting point of this layer
+                    if meeting is None or reached[successor].depth + other[successor].depth < forward[meeting].depth + backward[meeting].depth:
+                        meeting = successor
+        if layer is forwardLayer:
+            forwardLayer = nextLayer
+        else:
+            backwardLayer = nextLayer
+    lastSearchStatistics = stats
+    if meeting is None:
+        return None
+    problem.isGoalState(goal) #lets the problem do its bookkeeping (e.g. drawing the expanded cells)
+    return _joinPaths(forward[meeting], backward[meeting])
+
+def bidirectionalAStar(problem: SearchProblem, heuristic=nullHeuristic):
+    """
+    A* from the start towards problem.goal and, over reversed moves, from the
+    goal towards the start.  The backward search evaluates the heuristic on a
+    ReversedProblem.  Every time a state is reached by both searches the best
+    known path cost is updated, and the search stops once the smallest f value
+    of either frontier is no lower than it.  With a consistent heuristic the
+    returned path is optimal.
+    """
+    global lastSearchStatistics
+    stats = SearchStatistics()
+    start, goal = problem.getStartState(), _getGoalState(problem)
+    reversedProblem = ReversedProblem(problem)
+    sides = []
+    for root, heuristicProblem, expand in [(start, problem, problem.getSuccessors), (goal, reversedProblem, lambda state: getPredecessors(problem, state))]:
+        frontier = util.PriorityQueue()
+        frontier.push(root, heuristic(root, heuristicProblem))
+        #each side: frontier, best known node of every reached state, closed states, problem for the heuristic and successor function
+        sides.append((frontier, {root: SearchNode(root)}, set(), heuristicProblem, expand))
+    bestCost, meeting = float('inf'), None
+    if start == goal:
+        bestCost, meeting = 0, start
+    while not sides[0][0].isEmpty() and not sides[1][0].isEmpty():
+        stats.maxFrontier = max(stats.maxFrontier, len(sides[0][0]) + len(sides[1][0]))
+        if max(sides[0][0].getPriority(sides[0][0].peek()), sides[1][0].getPriority(sides[1][0].peek())) >= bestCost:
+            break #no path through either frontier can be cheaper than the one we have
+        side = 0 if len(sides[0][0]) <= len(sides[1][0]) else 1 #expand the smaller side
+        frontier, reached, closed, heuristicProblem, expand = sides[side]
+        otherReached = sides[1 - side][1]
+        state = frontier.pop()
+        node = reached[state]
+        closed.add(state)
+        stats.expanded += 1
+        for successor, action, stepCost in expand(state):
+            if successor in closed:
+                continue
+            queued = reached.get(successor)
+            if queued is not None and queued.pathCost <= node.pathCost + stepCost:
+                continue
+            child = SearchNode(successor, node, action, stepCost)
+            reached[successor] = child
+            frontier.push(successor, child.pathCost + heuristic(successor, heuristicProblem))
+            if successor in otherReached and child.pathCost + otherReached[successor].pathCost < bestCost:
+                bestCost, meeting = child.pathCost + otherReached[successor].pathCost, successor
+    lastSearchStatistics = stats
+    if meeting is None:
+        return None
+    problem.isGoalState(goal) #lets the problem do its bookkeeping (e.g. drawing the expanded cells)
+    return _joinPaths(sides[0][1][meeting], sides[1][1][meeting])
+
+def idaStarSearch(problem: SearchProblem, heuristic=nullHeuristic):
+    """
+    Iterative deepening A*: repeated depth first searches that only follow
+    nodes whose f = g + h does not exceed a bound, starting from h(start) and
+    raising the bound to the smallest f that exceeded it in the last pass.
+    Only the current path (and the successors still to try along it) is kept
+    in memory; states are only checked against the current path, so in graphs
+    with many paths to the same state (e.g. open mazes) nodes get re-expanded a
+    lot.  With an admissible heuristic the returned path is optimal.
+    """
+    global lastSearchStatistics
+    stats = SearchStatistics()
+    root = SearchNode(problem.getStartState())
+    bound = heuristic(root.state, problem)
+    while True:
+        nextBound = float('inf') #the smallest f above the bound seen in this pass
+        onPath = set([root.state]) #the states on the current path,to avoid cycles
+        stack = [(root, None)] #nodes of the current path and the iterator over the successors still to try
+        while stack:
+            node, successors = stack[-1]
+            if successors is None: #first visit of the node
+                f = node.pathCost + heuristic(node.state, problem)
+                if f > bound:
+                    nextBound = min(nextBound, f)
+                    stack.pop()
+                    onPath.discard(node.state)
+                    continue
+                if problem.isGoalState(node.state):
+                    lastSearchStatistics = stats
+                    return node.getActions()
+                stats.expanded += 1
+                successors = iter(problem.getSuccessors(node.state))
+                stack[-1] = (node, successors)
+            for successor, action, stepCost in successors:
+                if successor not in onPath:
+                    onPath.add(successor)
+                    stack.append((SearchNode(successor, node, action, stepCost), None))
+                    stats.maxFrontier = max(stats.maxFrontier, len(stack))
+                    break
+            else: #every successor has been tried,backtrack
+                stack.pop()
+                onPath.discard(node.state)
+        if nextBound == float('inf'): #nothing was cut off,so there is no solution
+            lastSearchStatistics = stats
+            return None
+        bound = nextBound
+
+SMA_STAR_MAX_NODES = 10000 # default node budget of smaStarSearch
+SMA_STAR_MAX_EXPANSIONS = 1000000 # smaStarSearch gives up after this many expansions
+
+class MemoryBoundedNode(SearchNode):
+    """
+    A node of the tree kept in memory by smaStarSearch.  Besides the SearchNode
+    fields it keeps its (backed up) f value, its children in memory and the
+    successors that are not in memory, as [f, state, action, stepCost] entries
+    (None until the node is expanded).  The f of a successor that has been
+    forgotten is the backed up f it had when it was dropped.
+    """
+    __slots__ = ('f', 'children', 'pending')
+
+    def __init__(self, state, parent=None, action=None, stepCost=0):
+        SearchNode.__init__(self, state, parent, action, stepCost)
+        self.f = 0
+        self.children = []
+        self.pending = None
+
+def smaStarSearch(problem: SearchProblem, heuristic=nullHeuristic, maxNodes=SMA_STAR_MAX_NODES, maxExpansions=SMA_STAR_MAX_EXPANSIONS):
+    """
+    Simplified memory-bounded A* (SMA*).  Works like A* on the search tree, but
+    a node generates its successors one at a time, the most promising first.
+    When 'maxNodes' nodes are in memory the worst leaf (highest f, shallowest)
+    is dropped before a new node is generated; its parent keeps its f, so the
+    subtree is regenerated if it becomes the most promising again.  f values are
+    backed up from children to parents.  Only the states on the path to a node
+    are excluded from its successors.
+
+    The memory in use never exceeds maxNodes nodes (it can be set from the
+    command line, e.g. -a fn=smaStarSearch,maxNodes=5000).  A successor that
+    is not a goal and lies at depth maxNodes - 1 can not lead to a path that
+    fits, so its f is infinite.  Given enough expansions, a solution that
+    takes d steps is found if maxNodes > d, and the returned path is optimal
+    if an optimal one fits.  On graphs with many paths to the same state
+    (e.g. open mazes) a tight budget makes the search regenerate the same
+    subtrees over and over, so it gives up and returns None after
+    'maxExpansions' expansions.
+
+    >>> import layout, pacman, searchAgents
+    >>> def pathLength(mazeName, start, goal, maxNodes, maxExpansions=SMA_STAR_MAX_EXPANSIONS):
+    ...     state = pacman.GameState()
+    ...     state.initialize(layout.getLayout(mazeName), 0)
+    ...     problem = searchAgents.PositionSearchProblem(state, start=start, goal=goal, warn=False, visualize=False)
+    ...     path = smaStarSearch(problem, searchAgents.manhattanHeuristic, maxNodes, maxExpansions)
+    ...     return path if path is None else len(path)
+    >>> [pathLength('mediumMaze', (34, 16), (1, 1), maxNodes) for maxNodes in (68, 69, 70)]
+    [None, 68, 68]
+    >>> [pathLength('openMaze', (24, 5), (27, 4), maxNodes) for maxNodes in (4, 5, 6)]
+    [None, 4, 4]
+    >>> print(pathLength('openMaze', (23, 10), (2, 11), 44, maxExpansions=10000))
+    None
+    """
+    global lastSearchStatistics
+    stats = SearchStatistics()
+    maxNodes = max(int(maxNodes), 2)
+    infinity = float('inf')
+    frontier = util.PriorityQueue() #the nodes with successors to generate,by (f, -depth): lowest f first,deepest on ties
+    leaves = util.PriorityQueue() #the nodes without children in memory,by (-f, depth): the worst one first
+
+    def requeue(node):
+        "Puts 'node' in the frontier by the f of its most promising successor not in memory"
+        if node.pending:
+            frontier.replace(node, (min(entry[0] for entry in node.pending), -node.depth))
+        elif node in frontier:
+            frontier.remove(node)
+
+    def backup(node):
+        "Recomputes the f value of 'node' from its successors and propagates it up the tree"
+        while node is not None:
+            f = min([child.f for child in node.children] + [entry[0] for entry in node.pending] + [infinity])
+            if f == node.f:
+                break
+            node.f = f
+            if node in leaves:
+                leaves.replace(node, (-f, node.depth))
+            node = node.parent
+
+    def forget(node, remember):
+        """
+        Removes a leaf from the tree.  If 'remember' is set its parent keeps
+        its f,so that it can be generated again.  Returns the parent.
+        """
+        parent = node.parent
+        parent.children.remove(node)
+        if memory.get(node.state) is node:
+            del memory[node.state]
+        if node in frontier:
+            frontier.remove(node)
+        if node in leaves:
+            leaves.remove(node)
+        if remember:
+            parent.pending.append([node.f, node.state, node.action, node.pathCost - parent.pathCost])
+            requeue(parent)
+        if not parent.children and parent.parent is not None:
+            leaves.push(parent, (-parent.f, parent.depth))
+        return parent
+
+    def prune(node):
+        "Drops 'node' and its ancestors for good while they have nothing left to explore"
+        removed = 0
+        while not node.children and not node.pending and node.parent is not None:
+            node = forget(node, False)
+            removed += 1
+        backup(node)
+        return removed
+
+    root = MemoryBoundedNode(problem.getStartState())
+    root.f = heuristic(root.state, problem)
+    frontier.push(root, (root.f, 0))
+    memory = {root.state: root} #the cheapest node in memory of every state
+    used = 1 #the nodes in memory
+    while not frontier.isEmpty() and stats.expanded < maxExpansions:
+        best = frontier.peek()
+        if frontier.getPriority(best)[0] == infinity: #everything left needs more memory than we have
+            break
+        if best.pending is None: #first visit of the node
+            if problem.isGoalState(best.state):
+                lastSearchStatistics = stats
+                return best.getActions()
+            stats.expanded += 1
+            ancestors = set()
+            node = best
+            while node is not None:
+                ancestors.add(node.state)
+                node = node.parent
+            best.pending = []
+            for successor, action, stepCost in problem.getSuccessors(best.state):
+                if successor in ancestors:
+                    continue
+                if best.depth + 1 >= maxNodes - 1 and not problem.isGoalState(successor):
+                    f = infinity #no room in memory for a path through it
+                else:
+                    f = max(best.f, best.pathCost + stepCost + heuristic(successor, problem)) #pathmax keeps f monotone
+                best.pending.append([f, successor, action, stepCost])
+            requeue(best)
+            used -= prune(best) #a dead end is dropped for good
+            continue
+        entry = min(best.pending, key=lambda entry: entry[0]) #the most promising successor not in memory
+        best.pending.remove(entry)
+        requeue(best)
+        f, successor, action, stepCost = entry
+        if successor in memory and memory[successor].pathCost <= best.pathCost + stepCost:
+            used -= prune(best) #a path to it that is at least as cheap is in memory,drop this one for good
+            continue
+        if used >= maxNodes: #make room by dropping the worst leaf other than best
+            leaf = leaves.pop()
+            if leaf is best:
+                leaf = leaves.pop()
+                leaves.push(best, (-best.f, best.depth))
+            backup(forget(leaf, True))
+            used -= 1
+        child = MemoryBoundedNode(successor, best, action, stepCost)
+        child.f = f
+        memory[successor] = child
+        if best in leaves:
+            leaves.remove(best)
+        best.children.append(child)
+        frontier.push(child, (f, -child.depth))
+        leaves.push(child, (-f, child.depth))
+        used += 1
+        stats.maxFrontier = max(stats.maxFrontier, used)
+    lastSearchStatistics = stats
+    return None
 
 
 # Abbreviations
@@ -161,3 +560,7 @@ bfs = breadthFirstSearch
 dfs = depthFirstSearch
 astar = aStarSearch
 ucs = uniformCostSearch
+bibfs = bidirectionalSearch
+biastar = bidirectionalAStar
+idastar = idaStarSearch
+smastar = smaStarSearch
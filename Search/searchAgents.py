@@ -40,10 +40,18 @@ from typing import List, Tuple, Any
 from game import Directions
 from game import Agent
 from game import Actions
+from game import BitGrid
+from layout import MazeAdjacency
 import util
 import time
 import search
 import pacman
+import array
+import hashlib
+import mmap
+import os
+import struct
+import sys
 
 class GoWestAgent(Agent):
     "An agent that goes West until it can't."
@@ -72,21 +80,34 @@ class SearchAgent(Agent):
     Options for fn include:
       depthFirstSearch or dfs
       breadthFirstSearch or bfs
+      bidirectionalSearch or bibfs (needs a problem with a single goal)
+      bidirectionalAStar or biastar (same)
+      idaStarSearch or idastar
+      smaStarSearch or smastar (node budget set with maxNodes)
 
+    cacheDir=<directory> keeps the maze distance tables of the layouts in that
+    directory across runs (see MazeDistanceOracle); without it nothing is
+    written to disk.
 
     Note: You should NOT change any code in SearchAgent
     """
 
-    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic'):
+    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic', maxNodes=None, cacheDir=None):
         # Warning: some advanced Python magic is employed below to find the right functions and problems
 
         # Get the search function from the name and heuristic
         if fn not in dir(search):
             raise AttributeError(fn + ' is not a search function in search.py.')
         func = getattr(search, fn)
+        searchArgs = {} # extra options for the search function
+        if maxNodes != None:
+            if 'maxNodes' not in func.__code__.co_varnames:
+                raise AttributeError(fn + ' does not take a node budget (maxNodes).')
+            print('[SearchAgent] using a budget of %s nodes' % maxNodes)
+            searchArgs['maxNodes'] = int(maxNodes)
         if 'heuristic' not in func.__code__.co_varnames:
             print('[SearchAgent] using function ' + fn)
-            self.searchFunction = func
+            self.searchFunction = func if not searchArgs else lambda x: func(x, **searchArgs)
         else:
             if heuristic in globals().keys():
                 heur = globals()[heuristic]
@@ -96,7 +117,11 @@ class SearchAgent(Agent):
                 raise AttributeError(heuristic + ' is not a function in searchAgents.py or search.py.')
             print('[SearchAgent] using function %s and heuristic %s' % (fn, heuristic))
             # Note: this bit of Python trickery combines the search algorithm and the heuristic
-            self.searchFunction = lambda x: func(x, heuristic=heur)
+            self.searchFunction = lambda x: func(x, heuristic=heur, **searchArgs)
+
+        self.cacheDir = cacheDir
+        if cacheDir != None:
+            print('[SearchAgent] keeping maze distance tables in ' + cacheDir)
 
         # Get the search problem type from the name
         if prob not in globals().keys() or not prob.endswith('Problem'):
@@ -116,12 +141,16 @@ class SearchAgent(Agent):
         if self.searchFunction == None: raise Exception("No search function provided for SearchAgent")
         starttime = time.time()
         problem = self.searchType(state) # Makes a new search problem
+        cacheDir = getattr(self, 'cacheDir', None) # subclasses that set their own search may not have one
+        if cacheDir != None:
+            problem.cacheDir = cacheDir # where the heuristic keeps its maze distance tables
         self.actions  = self.searchFunction(problem) # Find a path
         if self.actions == None:
             self.actions = []
         totalCost = problem.getCostOfActions(self.actions)
         print('Path found with total cost of %d in %.1f seconds' % (totalCost, time.time() - starttime))
         if '_expanded' in dir(problem): print('Search nodes expanded: %d' % problem._expanded)
+        print('Search statistics: %s' % search.lastSearchStatistics)
 
     def getAction(self, state):
         """
@@ -159,6 +188,7 @@ class PositionSearchProblem(search.SearchProblem):
         goal: A position in the gameState
         """
         self.walls = gameState.getWalls()
+        self.moves = gameState.getAdjacency().moves # open cell -> (action, next cell) pairs
         self.startState = gameState.getPacmanPosition()
         if start != None: self.startState = start
         self.goal = goal
@@ -198,15 +228,8 @@ class PositionSearchProblem(search.SearchProblem):
          cost of expanding to that successor
         """
 
-        successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextState = (nextx, nexty)
-                cost = self.costFn(nextState)
-                successors.append( ( nextState, action, cost) )
+        costFn = self.costFn
+        successors = [ ( nextState, action, costFn(nextState) ) for action, nextState in self.moves.get(state, ()) ]
 
         # Bookkeeping for display purposes
         self._expanded += 1 # DO NOT CHANGE
@@ -216,6 +239,15 @@ class PositionSearchProblem(search.SearchProblem):
 
         return successors
 
+    def getPredecessors(self, state):
+        """
+        Returns (predecessor, action, stepCost) triples for the backward half of
+        a bidirectional search: 'action' moves from 'predecessor' into 'state',
+        which costs costFn(state).  Counts as an expansion like getSuccessors.
+        """
+        cost = self.costFn(state)
+        return [ ( previous, Actions.reverseDirection(action), cost ) for previous, action, _ in self.getSuccessors(state) ]
+
     def getCostOfActions(self, actions):
         """
         Returns the cost of a particular sequence of actions. If those actions
@@ -276,7 +308,8 @@ class CornersProblem(search.SearchProblem):
     """
     This search problem finds paths through all four corners of a layout.
 
-    You must select a suitable state space and successor function
+    A search state is a tuple (position, foundCorners) where foundCorners is a
+    4 bit mask: bit i is set once self.corners[i] has been visited.
     """
 
     def __init__(self, startingGameState: pacman.GameState):
@@ -292,22 +325,24 @@ class CornersProblem(search.SearchProblem):
                 print('Warning: no food in corner ' + str(corner))
         self._expanded = 0 # DO NOT CHANGE; Number of search nodes expanded
 
+        self.allCorners = (1 << len(self.corners)) - 1 #the mask of a state that has found every corner
+        self.cornerBits = {} #corner position -> its bit(s) in the mask
+        for i, corner in enumerate(self.corners):
+            self.cornerBits[corner] = self.cornerBits.get(corner, 0) | (1 << i)
+        self.moves = startingGameState.getAdjacency().moves #open cell -> (action, next cell) pairs of its legal moves
+
     def getStartState(self):
         """
         Returns the start state (in your state space, not the full Pacman state
         space)
         """
-        cornersfound = [] #hold the corners found in the current game state
-        return (self.startingPosition,cornersfound) #return the starting position(x,y) of the pacman along with the how many corners we have found
+        return (self.startingPosition, 0) #no corner has been found yet
 
     def isGoalState(self, state: Any):
         """
         Returns whether this search state is a goal state of the problem.
         """
-        if len(state[1]) == 4: #if the length of the list cornersfound is 4(that means all 4 corners have been found)
-            return True #return true
-        else:
-            return False #return false
+        return state[1] == self.allCorners #every corner bit is set
 
 
     def getSuccessors(self, state: Any):
@@ -320,21 +355,9 @@ class CornersProblem(search.SearchProblem):
             state, 'action' is the action required to get there, and 'stepCost'
             is the incremental cost of expanding to that successor
         """
-        successors = [] #a list to hold all the successors
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            # Add a successor state to the successor list if the action is legal
-            # Here's a code snippet for figuring out whether a new position hits a wall:
-            x,y = state[0] #get the current coords of the pacman
-            foundCorners = state[1] #get the current corners we have found
-            dx, dy = Actions.directionToVector(action) #find the offset between positions
-            nextx, nexty = int(x + dx), int(y + dy) #calculate the new (x,y)
-            nextState = (nextx,nexty) #the next state is the coordinates we found
-            if not self.walls[nextx][nexty]: #if the move we want to make doesn't hit to a wall
-                if nextState in self.corners and nextState not in foundCorners: #and if that move leads to a corner that hasn't been found yet(not in found corners)
-                    foundCorners = foundCorners + [nextState] #add the next state to the found corners
-                    successors.append(((nextState, foundCorners), action, 1)) #append it to the successors list
-                else: #else no new corner was found
-                    successors.append(((nextState, foundCorners), action, 1)) #append the new move to the successors list
+        position, foundCorners = state
+        cornerBits = self.cornerBits
+        successors = [((nextState, foundCorners | cornerBits.get(nextState, 0)), action, 1) for action, nextState in self.moves.get(position, ())]
         self._expanded += 1 # DO NOT CHANGE
         return successors
 
@@ -369,12 +392,12 @@ def cornersHeuristic(state: Any, problem: CornersProblem):
     walls = problem.walls # These are the walls of the maze, as a Grid (game.py)
 
     unvisited = [] #list to store all the unvisited corners
-    visited = state[1] #list to store the visited corners
+    visited = state[1] #bit mask of the visited corners
     currentstate = state[0] #current state of the pacman
     heuristic = 0 #heuristic value
 
-    for corner in corners:#for every corner
-        if not corner in visited: #if they havent been visited
+    for i, corner in enumerate(corners):#for every corner
+        if not visited & (1 << i) and corner not in unvisited: #if they havent been visited
             unvisited.append(corner) #add them to the unvisited
     # Find the sum of the shortest distances between the unvisited corners
     # using manhattanDistance, which never returns a negative
@@ -401,33 +424,37 @@ class FoodSearchProblem:
 
     A search state in this problem is a tuple ( pacmanPosition, foodGrid ) where
       pacmanPosition: a tuple (x,y) of integers specifying Pacman's position
-      foodGrid:       a Grid (see game.py) of either True or False, specifying remaining food
+      foodGrid:       a BitGrid (see game.py) of either True or False, specifying remaining food
+
+    Successors that don't eat a dot share the food grid of their parent, so
+    search states must never be modified.
     """
     def __init__(self, startingGameState: pacman.GameState):
-        self.start = (startingGameState.getPacmanPosition(), startingGameState.getFood())
+        self.start = (startingGameState.getPacmanPosition(), BitGrid.fromGrid(startingGameState.getFood()))
         self.walls = startingGameState.getWalls()
+        self.moves = startingGameState.getAdjacency().moves
         self.startingGameState = startingGameState
         self._expanded = 0 # DO NOT CHANGE
         self.heuristicInfo = {} # A dictionary for the heuristic to store information
+        self.cacheDir = None # a directory for the maze distance tables, set by SearchAgent's cacheDir option
 
     def getStartState(self):
         return self.start
 
     def isGoalState(self, state):
-        return state[1].count() == 0
+        return state[1].bits == 0
 
     def getSuccessors(self, state):
         "Returns successor states, the actions they require, and a cost of 1."
         successors = []
         self._expanded += 1 # DO NOT CHANGE
-        for direction in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state[0]
-            dx, dy = Actions.directionToVector(direction)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextFood = state[1].copy()
-                nextFood[nextx][nexty] = False
-                successors.append( ( ((nextx, nexty), nextFood), direction, 1) )
+        food = state[1]
+        for direction, nextPosition in self.moves.get(state[0], ()):
+            nextFood = food
+            if food.isSet(*nextPosition):
+                nextFood = food.copy()
+                nextFood.clear(*nextPosition)
+            successors.append( ( (nextPosition, nextFood), direction, 1) )
         return successors
 
     def getCostOfActions(self, actions):
@@ -479,18 +506,44 @@ def foodHeuristic(state: Tuple[Tuple, List[List]], problem: FoodSearchProblem):
     problem.heuristicInfo['wallCount']
     """
     currentstate, foodGrid = state #get the current state and the food grid
-    food = foodGrid.asList() #make food grid a list
-    heuristic = 0 #heuristic value
-    distance = [] #list to store the manhattan distances
-    for dot in food: #for every food
-      distance.append((util.manhattanDistance(currentstate,dot),dot)) #add the manhattan distance along with the dot coords in the list
-    if len(distance) > 0: #if the list is not empty(there is still food)
-        dist,dot = min(distance) #find the min manhattan distance
-        newdist = mazeDistance(currentstate,dot,problem.startingGameState) #find the real distance between our position and the dot
-        heuristic+=newdist #add that value to the heuristic
-        currentstate = dot #new pos is the dot coords
-    return heuristic
-        
+    if foodGrid.count() == 0: #no food left,we are at a goal
+        return 0
+    if not isinstance(foodGrid, BitGrid): #a plain Grid,the memo is keyed by the bits of a BitGrid
+        foodGrid = BitGrid.fromGrid(foodGrid)
+    if 'oracle' not in problem.heuristicInfo: #the maze distances of the layout,computed once
+        problem.heuristicInfo['oracle'] = MazeDistanceOracle.forWalls(problem.walls, problem.moves, problem.cacheDir)
+        problem.heuristicInfo['food'] = {}
+    oracle = problem.heuristicInfo['oracle']
+    # The dots and the weight of their minimum spanning tree (on maze distances)
+    # only depend on the remaining food,so they are memoized by its bit mask
+    memo = problem.heuristicInfo['food']
+    if foodGrid.bits not in memo:
+        food = foodGrid.asList()
+        memo[foodGrid.bits] = (food, foodSpanningTreeWeight(food, oracle))
+    food, treeWeight = memo[foodGrid.bits]
+    distances = [oracle.getDistance(currentstate, dot) for dot in food] #maze distance to every dot
+    # Both bounds are consistent: we have to reach the farthest dot,and we have
+    # to reach the nearest one and then connect all the dots together
+    return max(max(distances), min(distances) + treeWeight)
+
+def foodSpanningTreeWeight(food, oracle):
+    """
+    Returns the weight of a minimum spanning tree over the dots in 'food',
+    where edges are weighted by maze distance (Prim's algorithm, O(n^2)).
+    """
+    if not food:
+        return 0
+    weight = 0
+    closest = dict((dot, oracle.getDistance(food[0], dot)) for dot in food[1:]) #distance of every dot outside the tree to the tree
+    while closest:
+        dot = min(closest, key=closest.get) #the dot closest to the tree joins it
+        weight += closest.pop(dot)
+        for other in closest:
+            distance = oracle.getDistance(dot, other)
+            if distance < closest[other]:
+                closest[other] = distance
+    return weight
+
 
 class ClosestDotSearchAgent(SearchAgent):
     "Search for all food using a sequence of searches"
@@ -544,6 +597,7 @@ class AnyFoodSearchProblem(PositionSearchProblem):
 
         # Store info for the PositionSearchProblem (no need to change this)
         self.walls = gameState.getWalls()
+        self.moves = gameState.getAdjacency().moves
         self.startState = gameState.getPacmanPosition()
         self.costFn = lambda x: 1
         self._visited, self._visitedlist, self._expanded = {}, [], 0 # DO NOT CHANGE
@@ -558,7 +612,7 @@ class AnyFoodSearchProblem(PositionSearchProblem):
             return True
         return False
 
-def mazeDistance(point1: Tuple[int, int], point2: Tuple[int, int], gameState: pacman.GameState) -> int:
+def mazeDistance(point1: Tuple[int, int], point2: Tuple[int, int], gameState: pacman.GameState, cacheDirectory: str = None) -> int:
     """
     Returns the maze distance between any two points, using the search functions
     you have already built. The gameState can be any game state -- Pacman's
@@ -567,11 +621,126 @@ def mazeDistance(point1: Tuple[int, int], point2: Tuple[int, int], gameState: pa
     Example usage: mazeDistance( (2,4), (5,6), gameState)
 
     This might be a useful helper function for your ApproximateSearchAgent.
+
+    The distances come from the MazeDistanceOracle of the layout, so only the
+    first call on a layout pays for the searches (or none at all, if an earlier
+    run saved them in cacheDirectory).
     """
     x1, y1 = point1
     x2, y2 = point2
     walls = gameState.getWalls()
     assert not walls[x1][y1], 'point1 is a wall: ' + str(point1)
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
-    prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False, visualize=False)
-    return len(search.bfs(prob))
+    return MazeDistanceOracle.forWalls(walls, gameState.getAdjacency().moves, cacheDirectory).getDistance(point1, point2)
+
+MAZE_DISTANCE_CACHE = {} # (wall digest, cache directory) -> MazeDistanceOracle
+MAZE_DISTANCE_LAST = None # the oracle returned by the last forWalls call
+
+class MazeDistanceOracle:
+    """
+    The maze distances between every pair of open cells of a layout.
+
+    The table is filled with one breadth first search per open cell the first
+    time a layout is seen and stored as an array of 16 bit distances, indexed by
+    (source cell id * number of open cells + target cell id).  If it is given a
+    cacheDirectory (SearchAgent's cacheDir option), it is also saved there
+    under a digest of the walls, so later runs on the same layout memory-map
+    the file instead of searching again.  Without one nothing is written.
+
+    The searches follow moves, the legal moves of the MazeAdjacency of the
+    layout (see layout.py), which is compiled from the walls if not given.
+    """
+    MAGIC = b'MZD1'
+    UNREACHABLE = 0xFFFF
+
+    def __init__(self, walls, cacheDirectory=None, moves=None):
+        self.walls = walls
+        self.moves = moves
+        self.cacheDirectory = cacheDirectory
+        self.cells = [(x, y) for x in range(walls.width) for y in range(walls.height) if not walls[x][y]]
+        self.cellIds = dict((cell, i) for i, cell in enumerate(self.cells))
+        self.digest = MazeDistanceOracle.wallsDigest(walls)
+        self.distances = None
+        cacheFile = None
+        if cacheDirectory is not None:
+            cacheFile = os.path.join(cacheDirectory, 'maze-%s.dist' % self.digest)
+            self.distances = self._load(cacheFile)
+        if self.distances is None:
+            self.distances = self._compute()
+            if cacheFile is not None:
+                self._save(cacheFile)
+
+    def forWalls(walls, moves=None, cacheDirectory=None):
+        "Returns the (shared) oracle of a walls Grid, whose MazeAdjacency moves are optional"
+        global MAZE_DISTANCE_LAST
+        if MAZE_DISTANCE_LAST is not None and MAZE_DISTANCE_LAST.walls is walls \
+                and MAZE_DISTANCE_LAST.cacheDirectory == cacheDirectory:
+            return MAZE_DISTANCE_LAST
+        key = (MazeDistanceOracle.wallsDigest(walls), cacheDirectory)
+        if key not in MAZE_DISTANCE_CACHE:
+            MAZE_DISTANCE_CACHE[key] = MazeDistanceOracle(walls, cacheDirectory, moves)
+        MAZE_DISTANCE_LAST = MAZE_DISTANCE_CACHE[key]
+        return MAZE_DISTANCE_LAST
+    forWalls = staticmethod(forWalls)
+
+    def wallsDigest(walls):
+        "A digest of the shape of a maze, stable across runs"
+        cells = bytes(1 if wall else 0 for column in walls.data for wall in column)
+        header = ('%d,%d,%s;' % (walls.width, walls.height, sys.byteorder)).encode()
+        return hashlib.sha1(header + cells).hexdigest()
+    wallsDigest = staticmethod(wallsDigest)
+
+    def getDistance(self, point1, point2):
+        "The maze distance between two open cells (infinity if they are not connected)"
+        n = len(self.cells)
+        distance = self.distances[self.cellIds[point1] * n + self.cellIds[point2]]
+        if distance == self.UNREACHABLE:
+            return float('inf')
+        return distance
+
+    def _compute(self):
+        n = len(self.cells)
+        moves = self.moves if self.moves is not None else MazeAdjacency(self.walls).moves
+        neighbors = [[self.cellIds[nextCell] for _, nextCell in moves[cell]] for cell in self.cells]
+        distances = array.array('H', [self.UNREACHABLE]) * (n * n)
+        for source in range(n):
+            row = source * n
+            distances[row + source] = 0
+            layer, depth = [source], 0
+            while layer:
+                depth += 1
+                nextLayer = []
+                for cell in layer:
+                    for neighbor in neighbors[cell]:
+                        if distances[row + neighbor] == self.UNREACHABLE:
+                            distances[row + neighbor] = depth
+                            nextLayer.append(neighbor)
+                layer = nextLayer
+        return distances
+
+    def _load(self, cacheFile):
+        "Memory-maps a saved table, or returns None if there is no usable one"
+        n = len(self.cells)
+        headerSize = len(self.MAGIC) + 4
+        try:
+            with open(cacheFile, 'rb') as f:
+                table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if table[:len(self.MAGIC)] != self.MAGIC or len(table) != headerSize + 2 * n * n \
+                or struct.unpack_from('<I', table, len(self.MAGIC))[0] != n:
+            table.close()
+            return None
+        return memoryview(table)[headerSize:].cast('H')
+
+    def _save(self, cacheFile):
+        "Saves the table; the cache is only an optimization, so failures are ignored"
+        try:
+            os.makedirs(os.path.dirname(cacheFile), exist_ok=True)
+            temporaryFile = '%s.%d.tmp' % (cacheFile, os.getpid())
+            with open(temporaryFile, 'wb') as f:
+                f.write(self.MAGIC + struct.pack('<I', len(self.cells)))
+                self.distances.tofile(f)
+            os.replace(temporaryFile, cacheFile)
+        except OSError:
+            pass
@@ -29,6 +29,7 @@
 import sys
 import inspect
 import heapq, random
+import collections
 
 
 class FixedRandom:
@@ -147,14 +148,17 @@ class Stack:
         "Returns true if the stack is empty"
         return len(self.list) == 0
 
+    def __len__(self):
+        return len(self.list)
+
 class Queue:
     "A container with a first-in-first-out (FIFO) queuing policy."
     def __init__(self):
-        self.list = []
+        self.list = collections.deque()
 
     def push(self,item):
         "Enqueue the 'item' into the queue"
-        self.list.insert(0,item)
+        self.list.appendleft(item)
 
     def pop(self):
         """
@@ -167,43 +171,94 @@ class Queue:
         "Returns true if the queue is empty"
         return len(self.list) == 0
 
+    def __len__(self):
+        return len(self.list)
+
 class PriorityQueue:
     """
       Implements a priority queue data structure. Each inserted item
       has a priority associated with it and the client is usually interested
       in quick retrieval of the lowest-priority item in the queue. This
       data structure allows O(1) access to the lowest-priority item.
+
+      Each (hashable) item is queued at most once.  A map from items to their
+      heap entries makes membership tests O(1) and lowering the priority of an
+      item O(log n): the old entry is only marked as removed and is skipped
+      when it reaches the top of the heap.  The heap is compacted whenever the
+      removed entries outnumber the live ones, so its size stays bounded by
+      twice the number of distinct items queued.
+
+      Pushing an item that is already queued keeps the lower of its two
+      priorities; replace also raises it.
     """
+    REMOVED = object() # placeholder for the item of an invalidated entry
+
     def  __init__(self):
         self.heap = []
+        self.entries = {}
         self.count = 0
 
     def push(self, item, priority):
-        entry = (priority, self.count, item)
+        "Queues 'item' with 'priority', or lowers its priority if it is already queued"
+        entry = self.entries.get(item)
+        if entry is not None:
+            if entry[0] <= priority:
+                return
+            self.remove(item)
+        entry = [priority, self.count, item]
+        self.entries[item] = entry
         heapq.heappush(self.heap, entry)
         self.count += 1
 
     def pop(self):
-        (_, _, item) = heapq.heappop(self.heap)
-        return item
+        while self.heap:
+            (_, _, item) = heapq.heappop(self.heap)
+            if item is not self.REMOVED:
+                del self.entries[item]
+                return item
+        raise IndexError('pop from an empty priority queue')
+
+    def remove(self, item):
+        "Removes 'item' from the queue (lazily; raises KeyError if it is not queued)"
+        entry = self.entries.pop(item)
+        entry[-1] = self.REMOVED
+        if len(self.heap) > 2 * len(self.entries) + 16:
+            self.heap = [e for e in self.heap if e[-1] is not self.REMOVED]
+            heapq.heapify(self.heap)
+
+    def peek(self):
+        "Returns the lowest-priority item without removing it"
+        while self.heap[0][-1] is self.REMOVED:
+            heapq.heappop(self.heap)
+        return self.heap[0][-1]
+
+    def getPriority(self, item):
+        return self.entries[item][0]
 
     def isEmpty(self):
-        return len(self.heap) == 0
+        return len(self.entries) == 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, item):
+        return item in self.entries
 
     def update(self, item, priority):
-        # If item already in priority queue with higher priority, update its priority and rebuild the heap.
+        # If item already in priority queue with higher priority, update its priority.
         # If item already in priority queue with equal or lower priority, do nothing.
         # If item not in priority queue, do the same thing as self.push.
-        for index, (p, c, i) in enumerate(self.heap):
-            if i == item:
-                if p <= priority:
-                    break
-                del self.heap[index]
-                self.heap.append((priority, c, item))
-                heapq.heapify(self.heap)
-                break
-        else:
-            self.push(item, priority)
+        entry = self.entries.get(item)
+        if entry is not None and entry[0] <= priority:
+            return False
+        self.push(item, priority)
+        return True
+
+    def replace(self, item, priority):
+        "Queues 'item' with 'priority', whether it is lower or higher than its current one"
+        if item in self.entries:
+            self.remove(item)
+        self.push(item, priority)
 
 class PriorityQueueWithFunction(PriorityQueue):
     """
@@ -211,6 +266,9 @@ class PriorityQueueWithFunction(PriorityQueue):
     Queue and the Stack classes. This is designed for drop-in replacement for
     those two classes. The caller has to provide a priority function, which
     extracts each item's priority.
+
+    Unlike PriorityQueue, items need not be hashable and equal items are
+    queued separately, so it can hold e.g. (state, actionsList) tuples.
     """
     def  __init__(self, priorityFunction):
         "priorityFunction (item) -> priority"
@@ -219,7 +277,45 @@ class PriorityQueueWithFunction(PriorityQueue):
 
     def push(self, item):
         "Adds an item to the queue with priority from the priority function"
-        PriorityQueue.push(self, item, self.priorityFunction(item))
+        heapq.heappush(self.heap, (self.priorityFunction(item), self.count, item))
+        self.count += 1
+
+    def pop(self):
+        (_, _, item) = heapq.heappop(self.heap)
+        return item
+
+    def peek(self):
+        return self.heap[0][-1]
+
+    def isEmpty(self):
+        return len(self.heap) == 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, item):
+        return any(i == item for (_, _, i) in self.heap)
+
+    def getPriority(self, item):
+        "Returns the priority of the copy of 'item' that pops first (KeyError if none is queued)"
+        return self._first(item)[0]
+
+    def remove(self, item):
+        "Removes the copy of 'item' that pops first (KeyError if none is queued)"
+        self.heap.remove(self._first(item))
+        heapq.heapify(self.heap)
+
+    def update(self, item, priority):
+        raise TypeError('PriorityQueueWithFunction takes its priorities from its priority function')
+
+    def replace(self, item, priority):
+        raise TypeError('PriorityQueueWithFunction takes its priorities from its priority function')
+
+    def _first(self, item):
+        entries = [entry for entry in self.heap if entry[-1] == item]
+        if not entries:
+            raise KeyError(item)
+        return min(entries, key=lambda entry: entry[:2])
 
 
 def manhattanDistance( xy1, xy2 ):